@@ -0,0 +1,130 @@
+import asyncio
+import os
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Generic, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    """Raised when the worker already runs as many store calls as it admits"""
+
+
+class AdmissionController:
+    """Caps the store calls a worker runs at once and rejects the excess immediately.
+
+    When the store slows down, requests beyond `max_inflight` get a 429
+    instead of queueing in the worker, so latency and memory stay bounded and
+    clients back off. Cache hits and coalesced requests never reach the store
+    and are not counted. `max_inflight=0` admits everything.
+    """
+
+    def __init__(self, max_inflight: int = 64):
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(max_inflight=int(os.getenv("MAX_INFLIGHT_STORE_CALLS", "64")))
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        if self.max_inflight and self.inflight >= self.max_inflight:
+            self.rejected += 1
+            raise Overloaded(f"{self.inflight} store calls already in flight")
+        self.inflight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_inflight": self.max_inflight,
+            "inflight": self.inflight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class SingleFlight(Generic[T]):
+    """Shares one in-flight computation between concurrent callers of the same key.
+
+    The computation runs as its own task, so a caller that disconnects does
+    not cancel it for the others. Keys leave the table as soon as their
+    result is ready; completed results are the retrieval cache's job.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Future[T]"] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _start(
+        self, keys: List[str], fetch: Callable[[List[str]], Awaitable[List[T]]]
+    ) -> List["asyncio.Future[T]"]:
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in keys]
+        for key, future in zip(keys, futures):
+            self._inflight[key] = future
+        self.started += len(keys)
+
+        def resolve(task: "asyncio.Task[List[T]]") -> None:
+            for key, future in zip(keys, futures):
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+            if task.cancelled():
+                for future in futures:
+                    future.cancel()
+            elif task.exception() is not None:
+                for future in futures:
+                    future.set_exception(task.exception())
+                    # Mark it retrieved: every caller may already have gone away
+                    future.exception()
+            else:
+                for future, result in zip(futures, task.result()):
+                    future.set_result(result)
+
+        asyncio.ensure_future(fetch(keys)).add_done_callback(resolve)
+        return futures
+
+    async def do(self, key: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        async def fetch_one(_: List[str]) -> List[T]:
+            return [await fetch()]
+
+        [result] = await self.do_many([key], fetch_one)
+        return result
+
+    async def do_many(
+        self, keys: List[str], fetch: Callable[[List[str]], Awaitable[List[T]]]
+    ) -> List[T]:
+        """Results for `keys`, in order.
+
+        Keys already in flight are joined; the others are computed by a single
+        `fetch(new_keys)` call, which returns one result per new key.
+        """
+        futures: List[Optional["asyncio.Future[T]"]] = []
+        new_keys: Dict[str, int] = {}
+        for key in keys:
+            future = self._inflight.get(key)
+            if future is not None or key in new_keys:
+                self.coalesced += 1
+            else:
+                new_keys[key] = len(new_keys)
+            futures.append(future)
+        if new_keys:
+            started = self._start(list(new_keys), fetch)
+            futures = [
+                future or started[new_keys[key]] for future, key in zip(futures, keys)
+            ]
+        return list(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
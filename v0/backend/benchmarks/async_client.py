@@ -0,0 +1,90 @@
+"""Concurrent retrieval throughput: blocking Weaviate client vs AsyncWeaviateClient.
+
+Reproduces what a single uvicorn worker does when `retrieve_actions` is hit by
+many requests at once. With the sync client every call blocks the event loop, so
+the requests are served one after another; with the async client they overlap.
+
+Needs a running Weaviate (see docker-compose.yml) and VOYAGEAI_API_KEY, or
+EMBEDDER=local to skip remote embedding calls.
+
+    python benchmarks/async_client.py --requests 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import weaviate
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+from embeddings import embedder_from_env  # noqa: E402
+from models import RetrievalQuery  # noqa: E402
+from weaviate_service import VECTOR_NAME, AsyncWeaviateClient, connection_params  # noqa: E402
+
+load_dotenv()
+
+QUERY = json.dumps([{"role": "user", "content": "Multiply two matrices A and B"}])
+
+
+async def run_sync(n_requests: int, concurrency: int, top_k: int) -> float:
+    # Baseline: the blocking client and embedder called straight from the loop
+    embedder = embedder_from_env()
+    client = weaviate.connect_to_local(**connection_params())
+    collection = client.collections.get("actions")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def handler():
+        async with semaphore:
+            # Same as the old `async def` endpoint: a blocking call on the loop
+            [vector] = embedder.embed([QUERY])
+            collection.query.hybrid(
+                query=QUERY, vector=vector, target_vector=VECTOR_NAME, limit=top_k
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n_requests)))
+    elapsed = time.perf_counter() - start
+    client.close()
+    await embedder.aclose()
+    return elapsed
+
+
+async def run_async(n_requests: int, concurrency: int, top_k: int) -> float:
+    client = AsyncWeaviateClient()
+    await client.connect()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def handler():
+        async with semaphore:
+            await client.retrieve_action_data(RetrievalQuery(query=QUERY, top_k=top_k))
+
+    # Warm the collection existence check so it is not part of the timing
+    await client.ensure_collection("actions")
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n_requests)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return elapsed
+
+
+async def main(n_requests: int, concurrency: int, top_k: int) -> None:
+    for name, runner in (("sync", run_sync), ("async", run_async)):
+        elapsed = await runner(n_requests, concurrency, top_k)
+        print(
+            f"{name:>5}: {n_requests} requests in {elapsed:.2f}s "
+            f"-> {n_requests / elapsed:.1f} req/s (concurrency={concurrency})"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.top_k))
@@ -0,0 +1,84 @@
+"""Import throughput: one insert per action vs batched inserts.
+
+Loads actions from populate/action_datas.json (repeated up to --count) and
+writes them into a scratch collection twice: once through add_action_data and
+once through add_action_data_batch. The scratch collection is dropped after
+each run.
+
+Needs a running Weaviate (see docker-compose.yml) and VOYAGEAI_API_KEY, or
+EMBEDDER=local to skip remote embedding calls.
+
+    python benchmarks/bulk_submit.py --count 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from itertools import cycle, islice
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+from models import ActionData  # noqa: E402
+from weaviate_service import AsyncWeaviateClient  # noqa: E402
+
+load_dotenv()
+
+ACTION_DATAS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "client",
+    "populate",
+    "action_datas.json",
+)
+
+
+def load_action_datas(count: int) -> list[ActionData]:
+    with open(ACTION_DATAS_PATH, "r") as f:
+        action_datas = [ActionData.model_validate(item) for item in json.load(f)]
+    return list(islice(cycle(action_datas), count))
+
+
+async def run_single(client: AsyncWeaviateClient, action_datas) -> float:
+    start = time.perf_counter()
+    for action_data in action_datas:
+        await client.add_action_data(action_data)
+    return time.perf_counter() - start
+
+
+async def run_batch(client: AsyncWeaviateClient, action_datas) -> float:
+    start = time.perf_counter()
+    result = await client.add_action_data_batch(action_datas)
+    elapsed = time.perf_counter() - start
+    if result.failed:
+        print(f"  {len(result.failed)} objects failed to import")
+    return elapsed
+
+
+async def main(count: int, collection_name: str) -> None:
+    action_datas = load_action_datas(count)
+    client = AsyncWeaviateClient(collection_name=collection_name)
+    # The corpus is repeated to reach --count, keep every copy
+    client.deduplicator.enabled = False
+    await client.connect()
+    try:
+        for name, runner in (("single", run_single), ("batch", run_batch)):
+            await client.ensure_collection(collection_name)
+            elapsed = await runner(client, action_datas)
+            await client.delete_collection(collection_name)
+            print(
+                f"{name:>6}: {count} actions in {elapsed:.2f}s "
+                f"-> {count / elapsed:.1f} actions/s"
+            )
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--collection", default="actions_bench")
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.collection))
@@ -0,0 +1,217 @@
+"""Throughput and tail latency of /submit_action and /retrieve_actions.
+
+Drives the FastAPI app in-process through httpx's ASGI transport. The app is
+backed by the NumPy store and the LocalEmbedder, so no Weaviate, Voyage or
+OpenAI is needed. The store is seeded from populate/action_datas.json.
+populate/tasks.jsonl is replayed as the retrieval query corpus. Pass --url to
+load a running server instead.
+
+Each scenario runs a closed loop: `concurrency` workers each send their next
+request as soon as the previous one returns, until `--requests` have been
+sent. Results go to stdout (or --output) as JSON, one entry per scenario and
+concurrency level, for tracking regressions:
+
+    python benchmarks/load_test.py --concurrency 1 8 32 --requests 500 \\
+        --history-turns 0 20 --output load_test.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import AsyncExitStack
+from itertools import cycle
+from typing import Callable, List, Optional
+
+import httpx
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+POPULATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "client",
+    "populate",
+)
+ACTION_DATAS_PATH = os.path.join(POPULATE_DIR, "action_datas.json")
+TASKS_PATH = os.path.join(POPULATE_DIR, "tasks.jsonl")
+
+# Offline stand-ins, set before main.py reads its configuration
+OFFLINE_ENV = {
+    "ACTION_STORE": "numpy",
+    "NUMPY_STORE_PATH": "",
+    "EMBEDDER": "local",
+    "EMBEDDING_CACHE_PATH": "",
+    "USAGE_STATS_PATH": "",
+    "RETRIEVAL_CACHE_GENERATION_PATH": "",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def load_corpus() -> tuple[list, list]:
+    with open(ACTION_DATAS_PATH, "r") as f:
+        action_datas = json.load(f)
+    # get_tasks.py wrote this file with the Windows default encoding
+    with open(TASKS_PATH, "r", encoding="cp1252") as f:
+        tasks = [json.loads(line)["description"] for line in f if line.strip()]
+    return action_datas, tasks
+
+
+def make_history(task: str, turns: int) -> List[dict]:
+    """The task as a user message, padded with `turns` assistant/user exchanges"""
+    history = [{"role": "user", "content": task}]
+    for i in range(turns):
+        history.append(
+            {"role": "assistant", "content": f"RETRY {i} FAILED: assertion error in action"}
+        )
+        history.append({"role": "user", "content": "Please try again."})
+    return history
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (0, 0, 0)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(latencies_ms.mean()), 3) if len(latencies_ms) else 0.0,
+            "max": round(float(latencies_ms.max()), 3) if len(latencies_ms) else 0.0,
+        },
+    }
+
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    make_request: Callable[[int], tuple[str, dict]],
+    n_requests: int,
+    concurrency: int,
+) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(n_requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in counter:
+            path, payload = make_request(index)
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def main(args: argparse.Namespace) -> List[dict]:
+    action_datas, tasks = load_corpus()
+    results = []
+    async with AsyncExitStack() as stack:
+        if args.url:
+            transport: Optional[httpx.AsyncBaseTransport] = None
+            base_url = args.url
+        else:
+            os.environ.update(OFFLINE_ENV)
+            if args.no_cache:
+                os.environ["RETRIEVAL_CACHE_MAX_ENTRIES"] = "0"
+            # Without dedup every submission is a real insert rather than a rejection
+            os.environ["DEDUP_ENABLED"] = "true" if args.dedup else "false"
+            from main import app
+
+            # The ASGI transport does not send lifespan events, so run the lifespan here
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            base_url = "http://backend"
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60)
+        )
+        seeded = await client.post("/submit_actions", json=action_datas)
+        seeded.raise_for_status()
+
+        for turns in args.history_turns:
+            queries = cycle(
+                {
+                    "chat_history": make_history(task, turns),
+                    "threshold": args.threshold,
+                    "top_k": args.top_k,
+                }
+                for task in tasks
+            )
+            for concurrency in args.concurrency:
+                summary = await run_closed_loop(
+                    client,
+                    lambda _: ("/retrieve_actions", next(queries)),
+                    args.requests,
+                    concurrency,
+                )
+                results.append(
+                    {
+                        "scenario": "retrieve_actions",
+                        "concurrency": concurrency,
+                        "history_turns": turns,
+                        **summary,
+                    }
+                )
+
+        for code_bytes in args.code_bytes:
+            def submission(index: int) -> tuple[str, dict]:
+                action_data = dict(action_datas[index % len(action_datas)])
+                action_data["code"] += "\n# " + "x" * code_bytes
+                return "/submit_action", action_data
+
+            for concurrency in args.concurrency:
+                summary = await run_closed_loop(
+                    client, submission, args.requests, concurrency
+                )
+                results.append(
+                    {
+                        "scenario": "submit_action",
+                        "concurrency": concurrency,
+                        "code_padding_bytes": code_bytes,
+                        **summary,
+                    }
+                )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Load a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--history-turns", type=int, nargs="+", default=[0],
+                        help="Extra chat turns per retrieval query (payload size)")
+    parser.add_argument("--code-bytes", type=int, nargs="+", default=[0],
+                        help="Padding added to each submitted action's code (payload size)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the retrieval cache")
+    parser.add_argument("--dedup", action="store_true", help="Keep duplicate rejection on")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "target": args.url or "in-process (numpy store, local embedder)",
+        "results": asyncio.run(main(args)),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,79 @@
+"""Query text size and retrieval latency vs chat history length.
+
+Compares the legacy `json.dumps(chat_history)` query text with the compact
+TextBuilder output, for histories padded with the kind of assistant retry
+dumps ActionClient accumulates in internal_chat_history. Runs fully offline
+against a NumpyActionStore seeded from populate/action_datas.json with the
+LocalEmbedder, so latency reflects embedding + hybrid search cost only.
+
+    python benchmarks/query_text.py --lengths 1 10 50 200 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embeddings import LocalEmbedder  # noqa: E402
+from models import ActionData, RetrievalQuery  # noqa: E402
+from numpy_store import NumpyActionStore  # noqa: E402
+from text_builder import TextBuilder  # noqa: E402
+
+ACTION_DATAS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "client",
+    "populate",
+    "action_datas.json",
+)
+
+
+def make_history(action_datas, length: int) -> list:
+    """A task message followed by `length - 1` retry dumps and user follow-ups"""
+    history = [action_datas[0].chat_history[0]]
+    for i in range(length - 1):
+        action_data = action_datas[i % len(action_datas)]
+        if i % 2 == 0:
+            content = (
+                f"Action data content\n```\n{action_data.model_dump_json()}\n```\n"
+                f"RETRY {i} FAILED: assertion error"
+            )
+            history.append({"role": "assistant", "content": content})
+        else:
+            history.append({"role": "user", "content": "Please try again."})
+    return history
+
+
+async def main(lengths: list, repeat: int) -> None:
+    with open(ACTION_DATAS_PATH, "r") as f:
+        action_datas = [ActionData.model_validate(item) for item in json.load(f)]
+    store = NumpyActionStore(embedder=LocalEmbedder())
+    await store.add_action_data_batch(action_datas)
+    builders = {"json": TextBuilder(mode="json"), "compact": TextBuilder()}
+
+    print(f"{'turns':>6} {'builder':>8} {'query bytes':>12} {'ms/query':>9}")
+    for length in lengths:
+        history = make_history(action_datas, length)
+        for name, builder in builders.items():
+            query_text = builder.build(history)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                await store.retrieve_action_data(
+                    RetrievalQuery(query=builder.build(history), top_k=5)
+                )
+            elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+            print(
+                f"{length:>6} {name:>8} {len(query_text.encode('utf-8')):>12} "
+                f"{elapsed_ms:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.lengths, args.repeat))
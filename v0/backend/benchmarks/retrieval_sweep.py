@@ -0,0 +1,203 @@
+"""Hit rate, false matches and latency of retrieval settings, to pick defaults.
+
+Replays populate/tasks.jsonl against a populated store the way the client's
+`retrieve_or_generate` queries it: the task as a user message, best_only, and
+the four fields the client reads. Every combination of --top-k, --thresholds
+and --alphas is scored on the same queries.
+
+Hybrid scores are min-max scaled over each result set, so the best result
+scores close to 1 whether or not it is relevant, and a threshold alone
+barely separates hits from false matches. --max-distances adds the absolute
+cosine-distance cut-off (`max_vector_distance`) as a fourth dimension.
+
+Ground truth: an action in populate/action_datas.json was generated for the
+task whose description is the action's first user message. A task whose
+action is stored is a positive query, and every other task is a negative one.
+Per setting the report gives:
+
+    hit_rate          positives answered with their own action
+    false_match_rate  queries answered with some other action
+    generation_rate   queries with no result, i.e. the client falls back to the LLM
+    latency_ms        per query, p50/p95/mean
+
+`recommended` is the fastest setting with the best hit rate whose
+false_match_rate stays within --max-false-match.
+
+By default the app runs in-process with the NumPy store and the LocalEmbedder
+(see load_test.py), seeded from populate/action_datas.json. The local
+embedder only hashes tokens, so use --url against a populated server with the
+production embedder for numbers that should drive the defaults. Run that
+server with RETRIEVAL_CACHE_MAX_ENTRIES=0 and HOT_TIER_SIZE=0 so repeated runs
+measure the store. Ground truth is read from /admin/export with ADMIN_TOKEN:
+
+    python benchmarks/retrieval_sweep.py --url http://localhost:8000 \\
+        --top-k 1 5 10 --thresholds 0.5 0.7 0.9 1.0 --alphas 0.5 0.7 0.9
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from contextlib import AsyncExitStack
+from itertools import product
+from typing import Dict, List, Optional, Set
+
+import httpx
+import numpy as np
+
+from load_test import OFFLINE_ENV, load_corpus
+
+# What ActionClient.retrieve_or_generate asks for
+CLIENT_FIELDS = ["input_json_schema", "output_json_schema", "code", "test"]
+
+
+def first_user_message(chat_history: List[dict]) -> Optional[str]:
+    for message in chat_history:
+        if message.get("role") == "user":
+            return message.get("content")
+    return None
+
+
+async def expected_actions(client: httpx.AsyncClient) -> Dict[str, Set[str]]:
+    """Task description -> ids of the stored actions generated for it"""
+    expected: Dict[str, Set[str]] = {}
+    headers = {"Authorization": f"Bearer {os.getenv('ADMIN_TOKEN', '')}"}
+    async with client.stream("GET", "/admin/export", headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            task = first_user_message(record["properties"]["chat_history"])
+            if task is not None:
+                expected.setdefault(task, set()).add(record["id"])
+    return expected
+
+
+async def evaluate(
+    client: httpx.AsyncClient,
+    tasks: List[str],
+    expected: Dict[str, Set[str]],
+    top_k: int,
+    threshold: float,
+    alpha: float,
+    max_distance: Optional[float],
+) -> dict:
+    hits = false_matches = generations = 0
+    latencies: List[float] = []
+    for task in tasks:
+        start = time.perf_counter()
+        response = await client.post(
+            "/retrieve_actions",
+            json={
+                "chat_history": [{"role": "user", "content": task}],
+                "top_k": top_k,
+                "threshold": threshold,
+                "alpha": alpha,
+                "max_vector_distance": max_distance,
+                "best_only": True,
+                "fields": CLIENT_FIELDS,
+            },
+        )
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            generations += 1
+        elif results[0]["id"] in expected.get(task, ()):
+            hits += 1
+        else:
+            false_matches += 1
+
+    positives = sum(task in expected for task in tasks)
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95 = np.percentile(latencies_ms, [50, 95])
+    return {
+        "top_k": top_k,
+        "threshold": threshold,
+        "alpha": alpha,
+        "max_vector_distance": max_distance,
+        "hit_rate": round(hits / positives, 4) if positives else 0.0,
+        "false_match_rate": round(false_matches / len(tasks), 4),
+        "generation_rate": round(generations / len(tasks), 4),
+        "latency_ms": {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "mean": round(float(latencies_ms.mean()), 3),
+        },
+    }
+
+
+def recommend(results: List[dict], max_false_match: float) -> Optional[dict]:
+    eligible = [r for r in results if r["false_match_rate"] <= max_false_match]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: (r["hit_rate"], -r["latency_ms"]["p50"]))
+
+
+async def main(args: argparse.Namespace) -> dict:
+    action_datas, tasks = load_corpus()
+    # tasks.jsonl repeats some steps; each distinct query is scored once
+    tasks = list(dict.fromkeys(tasks))[: args.limit]
+    async with AsyncExitStack() as stack:
+        if args.url:
+            transport: Optional[httpx.AsyncBaseTransport] = None
+            base_url = args.url
+        else:
+            os.environ.update(OFFLINE_ENV)
+            os.environ["RETRIEVAL_CACHE_MAX_ENTRIES"] = "0"
+            os.environ["HOT_TIER_SIZE"] = "0"
+            os.environ.setdefault("ADMIN_TOKEN", "retrieval-sweep")
+            from main import app
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            base_url = "http://backend"
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60)
+        )
+        if not args.url:
+            seeded = await client.post("/submit_actions", json=action_datas)
+            seeded.raise_for_status()
+        expected = await expected_actions(client)
+
+        results = []
+        for setting in product(
+            args.top_k, args.thresholds, args.alphas, args.max_distances
+        ):
+            results.append(await evaluate(client, tasks, expected, *setting))
+    return {
+        "queries": len(tasks),
+        "positives": sum(task in expected for task in tasks),
+        "results": results,
+        "recommended": recommend(results, args.max_false_match),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Evaluate a running, populated server instead")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--thresholds", type=float, nargs="+",
+                        default=[0.5, 0.7, 0.8, 0.9, 1.0])
+    parser.add_argument("--alphas", type=float, nargs="+", default=[0.25, 0.5, 0.7, 0.9])
+    parser.add_argument("--max-distances", type=float, nargs="+", default=[None],
+                        help="max_vector_distance cut-offs to sweep (default: none)")
+    parser.add_argument("--max-false-match", type=float, default=0.05,
+                        help="Highest false_match_rate a recommended setting may have")
+    parser.add_argument("--limit", type=int, help="Only replay the first N distinct tasks")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "target": args.url or "in-process (numpy store, local embedder)",
+        **asyncio.run(main(args)),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,79 @@
+"""Per-object cost of building a retrieval response at 1, 10 and 100 results.
+
+`pydantic`: the previous path. Stored properties are built into
+ScoredActionData models, re-validated against the List response model as
+FastAPI does, dumped to JSON-compatible python and encoded with json.dumps.
+
+`orjson`: the current path (`main.encode_results`). Stored properties are
+encoded directly with orjson, with no model construction.
+
+Runs offline on objects from populate/action_datas.json.
+
+    python benchmarks/serialization.py --sizes 1 10 100 --repeat 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from typing import List
+
+from pydantic import TypeAdapter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import encode_results  # noqa: E402
+from models import ScoredActionData  # noqa: E402
+
+ACTION_DATAS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "client",
+    "populate",
+    "action_datas.json",
+)
+
+RESPONSE_ADAPTER = TypeAdapter(List[ScoredActionData])
+
+
+def pydantic_path(scored_properties) -> bytes:
+    results = [
+        ScoredActionData(id=action_id, score=score, **properties)
+        for action_id, properties, score in scored_properties
+    ]
+    validated = RESPONSE_ADAPTER.validate_python(results)
+    content = RESPONSE_ADAPTER.dump_python(validated, mode="json", exclude_none=True)
+    return json.dumps(content).encode("utf-8")
+
+
+def orjson_path(scored_properties) -> bytes:
+    return encode_results(scored_properties)
+
+
+def main(sizes: List[int], repeat: int) -> None:
+    with open(ACTION_DATAS_PATH, "r") as f:
+        action_datas = json.load(f)
+    paths = {"pydantic": pydantic_path, "orjson": orjson_path}
+
+    print(f"{'results':>8} {'path':>9} {'us/response':>12} {'us/object':>10}")
+    for size in sizes:
+        scored_properties = [
+            (str(uuid.uuid4()), action_datas[i % len(action_datas)], 1.0 - i / size)
+            for i in range(size)
+        ]
+        for name, path in paths.items():
+            path(scored_properties)  # warm up
+            start = time.perf_counter()
+            for _ in range(repeat):
+                path(scored_properties)
+            elapsed_us = (time.perf_counter() - start) * 1e6 / repeat
+            print(f"{size:>8} {name:>9} {elapsed_us:>12.1f} {elapsed_us / size:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,101 @@
+import ast
+import hashlib
+import json
+import os
+from typing import Any
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_code(code: str) -> str:
+    """AST dump of the code, so comments and formatting do not matter"""
+    try:
+        return ast.dump(ast.parse(code))
+    except SyntaxError:
+        return " ".join(code.split())
+
+
+def _strip_descriptions(schema: Any) -> Any:
+    if isinstance(schema, dict):
+        return {
+            key: _strip_descriptions(value)
+            for key, value in schema.items()
+            if key != "description"
+        }
+    if isinstance(schema, list):
+        return [_strip_descriptions(value) for value in schema]
+    return schema
+
+
+def _canonical_schema(schema: str) -> str:
+    try:
+        parsed = json.loads(schema)
+    except json.JSONDecodeError:
+        return " ".join(schema.split())
+    return json.dumps(_strip_descriptions(parsed), sort_keys=True, separators=(",", ":"))
+
+
+def schema_fingerprint(input_json_schema: str, output_json_schema: str) -> str:
+    """Hash of the input/output schemas, ignoring descriptions and key order"""
+    return _sha256(
+        _canonical_schema(input_json_schema) + "\0" + _canonical_schema(output_json_schema)
+    )
+
+
+def action_fingerprint(code: str, schema_hash: str) -> str:
+    """Exact-duplicate key: normalized code plus schema fingerprint"""
+    return _sha256(normalize_code(code) + "\0" + schema_hash)
+
+
+class Deduplicator:
+    """Settings and counters for near-duplicate rejection on submit.
+
+    An incoming action is a duplicate when a stored action has the same
+    fingerprint, or has the same schema fingerprint and an embedding with
+    cosine similarity >= `similarity` among the `neighbours` nearest ones.
+    Duplicates are not inserted; the existing action stands in for them.
+    A batch looks up all its fingerprints at once, then runs up to
+    `concurrency` neighbour searches at a time.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        similarity: float = 0.95,
+        neighbours: int = 5,
+        concurrency: int = 8,
+    ):
+        self.enabled = enabled
+        self.similarity = similarity
+        self.neighbours = neighbours
+        self.concurrency = concurrency
+        self.checked = 0
+        self.duplicates = 0
+        self.bytes_saved = 0
+
+    @classmethod
+    def from_env(cls) -> "Deduplicator":
+        return cls(
+            enabled=os.getenv("DEDUP_ENABLED", "true").lower() == "true",
+            similarity=float(os.getenv("DEDUP_SIMILARITY", "0.95")),
+            neighbours=int(os.getenv("DEDUP_NEIGHBOURS", "5")),
+            concurrency=int(os.getenv("DEDUP_CONCURRENCY", "8")),
+        )
+
+    def record_duplicate(self, payload_bytes: int, vector_dimensions: int) -> None:
+        self.duplicates += 1
+        # Stored properties plus one float32 vector
+        self.bytes_saved += payload_bytes + 4 * vector_dimensions
+
+    def report(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "similarity": self.similarity,
+            "neighbours": self.neighbours,
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "duplicate_rate": self.duplicates / self.checked if self.checked else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List
+
+import httpx
+
+VOYAGEAI_EMBEDDINGS_URL = "https://api.voyageai.com/v1/embeddings"
+# Texts per VoyageAI request, the API accepts at most 128
+VOYAGEAI_BATCH_SIZE = 128
+
+
+class Embedder:
+    """Turns texts into vectors that are handed to the store (bring-your-own-vectors)"""
+
+    model: str = ""
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed, texts)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class VoyageEmbedder(Embedder):
+    def __init__(self, api_key: str, model: str = "voyage-2", timeout: float = 30.0):
+        if not api_key:
+            raise ValueError("Please provide a VoyageAI API key")
+        self.model = model
+        headers = {"Authorization": f"Bearer {api_key}"}
+        self._client = httpx.Client(headers=headers, timeout=timeout)
+        self._async_client = httpx.AsyncClient(headers=headers, timeout=timeout)
+
+    def _payload(self, texts: List[str]) -> dict:
+        return {"input": texts, "model": self.model}
+
+    @staticmethod
+    def _parse(response: httpx.Response) -> List[List[float]]:
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), VOYAGEAI_BATCH_SIZE):
+            chunk = texts[start : start + VOYAGEAI_BATCH_SIZE]
+            response = self._client.post(VOYAGEAI_EMBEDDINGS_URL, json=self._payload(chunk))
+            vectors.extend(self._parse(response))
+        return vectors
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), VOYAGEAI_BATCH_SIZE):
+            chunk = texts[start : start + VOYAGEAI_BATCH_SIZE]
+            response = await self._async_client.post(
+                VOYAGEAI_EMBEDDINGS_URL, json=self._payload(chunk)
+            )
+            vectors.extend(self._parse(response))
+        return vectors
+
+    async def aclose(self) -> None:
+        self._client.close()
+        await self._async_client.aclose()
+
+
+class LocalEmbedder(Embedder):
+    """Deterministic, network-free embedder for tests and benchmarks.
+
+    Hashes word unigrams and bigrams into a fixed number of signed buckets and
+    L2-normalizes the result, so texts sharing words land close together.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+        self.model = f"local-hash-{dimensions}"
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        tokens = re.findall(r"\w+", text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+
+class EmbeddingCache:
+    """Persistent float32 vectors in SQLite, keyed by a hash of (model, text).
+
+    Safe to call from several threads at once; calls share one connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(keys)
+        found: Dict[str, List[float]] = {}
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        rows = [(key, array("f", vector).tobytes()) for key, vector in vectors.items()]
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class CachedEmbedder(Embedder):
+    """Wraps an embedder so every distinct text is embedded at most once"""
+
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+        self.model = embedder.model
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, texts: List[str]) -> tuple[List[str], Dict[str, List[float]], List[str]]:
+        keys = [EmbeddingCache.key(self.model, text) for text in texts]
+        found = self.cache.get_many(set(keys))
+        missing = list({key: text for key, text in zip(keys, texts) if key not in found}.values())
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def _store(self, found: Dict[str, List[float]], missing: List[str], vectors: List[List[float]]) -> None:
+        new = {EmbeddingCache.key(self.model, text): vector for text, vector in zip(missing, vectors)}
+        self.cache.put_many(new)
+        found.update(new)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+        if missing:
+            self._store(found, missing, self.embedder.embed(missing))
+        return [found[key] for key in keys]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        # SQLite reads and commits can wait on other workers' writes, so they
+        # run in a thread instead of on the event loop
+        keys, found, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            vectors = await self.embedder.aembed(missing)
+            await asyncio.to_thread(self._store, found, missing, vectors)
+        return [found[key] for key in keys]
+
+    async def aclose(self) -> None:
+        await self.embedder.aclose()
+        self.cache.close()
+
+
+def embedder_from_env() -> Embedder:
+    """EMBEDDER=voyage|local, cached in EMBEDDING_CACHE_PATH unless it is empty"""
+    name = os.getenv("EMBEDDER", "voyage")
+    if name == "voyage":
+        embedder: Embedder = VoyageEmbedder(
+            api_key=os.getenv("VOYAGEAI_API_KEY", ""),
+            model=os.getenv("VOYAGEAI_MODEL", "voyage-2"),
+        )
+    elif name == "local":
+        embedder = LocalEmbedder(int(os.getenv("LOCAL_EMBEDDING_DIMENSIONS", "256")))
+    else:
+        raise ValueError(f"Unknown embedder '{name}', expected 'voyage' or 'local'")
+    cache_path = os.getenv("EMBEDDING_CACHE_PATH", "embeddings.sqlite3")
+    if cache_path:
+        embedder = CachedEmbedder(embedder, EmbeddingCache(cache_path))
+    return embedder
@@ -0,0 +1,207 @@
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from models import RetrievalQuery
+from store import ScoredProperties, project
+
+# (id, stored properties, vector) of an action loaded into the hot tier
+HotEntry = tuple[str, Dict[str, Any], List[float]]
+
+
+class UsageStats:
+    """Per-action retrieval and execution counts, persisted in SQLite.
+
+    Requests only bump in-memory counters; `flush()` adds them to the table,
+    so counts from every worker sharing `path` are summed. `path=":memory:"`
+    keeps the statistics for the life of the process only.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            " tenant TEXT NOT NULL, action_id TEXT NOT NULL,"
+            " retrievals INTEGER NOT NULL DEFAULT 0,"
+            " executions INTEGER NOT NULL DEFAULT 0,"
+            " failures INTEGER NOT NULL DEFAULT 0,"
+            " last_used REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (tenant, action_id))"
+        )
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(usage)")}
+        if "last_used" not in columns:
+            # Tables written before last_used was recorded
+            self.connection.execute(
+                "ALTER TABLE usage ADD COLUMN last_used REAL NOT NULL DEFAULT 0"
+            )
+        self.connection.commit()
+        # (tenant, action_id) -> [retrievals, executions, failures] not yet flushed
+        self._pending: Dict[tuple[str, str], List[int]] = {}
+
+    @classmethod
+    def from_env(cls) -> "UsageStats":
+        return cls(os.getenv("USAGE_STATS_PATH", "usage.sqlite3") or ":memory:")
+
+    def _counts(self, tenant: Optional[str], action_id: str) -> List[int]:
+        # The shared collection is stored as tenant "" since NULLs never match in keys
+        key = (tenant or "", action_id)
+        counts = self._pending.get(key)
+        if counts is None:
+            counts = self._pending[key] = [0, 0, 0]
+        return counts
+
+    def record_retrievals(self, tenant: Optional[str], action_ids: List[str]) -> None:
+        for action_id in action_ids:
+            self._counts(tenant, action_id)[0] += 1
+
+    def record_execution(self, tenant: Optional[str], action_id: str, success: bool) -> None:
+        counts = self._counts(tenant, action_id)
+        counts[1] += 1
+        if not success:
+            counts[2] += 1
+
+    def take_pending(self) -> Dict[tuple[str, str], List[int]]:
+        """Hand over the unflushed counters; called on the event loop before `flush`"""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def flush(self, pending: Dict[tuple[str, str], List[int]]) -> None:
+        if not pending:
+            return
+        now = time.time()
+        self.connection.executemany(
+            "INSERT INTO usage (tenant, action_id, retrievals, executions, failures, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (tenant, action_id) DO UPDATE SET"
+            " retrievals = retrievals + excluded.retrievals,"
+            " executions = executions + excluded.executions,"
+            " failures = failures + excluded.failures,"
+            " last_used = MAX(last_used, excluded.last_used)",
+            [
+                (tenant, action_id, *counts, now)
+                for (tenant, action_id), counts in pending.items()
+            ],
+        )
+        self.connection.commit()
+
+    def hottest(self, limit: int, active_since: float = 0.0) -> Dict[Optional[str], List[str]]:
+        """Ids of the `limit` most used actions per tenant, most used first.
+
+        Executions weigh double: an executed action was not only found but used.
+        Tenants with no use flushed since `active_since` (a `time.time()`) are
+        left out; the shared collection is always included.
+        """
+        rows = self.connection.execute(
+            "SELECT tenant, action_id FROM ("
+            " SELECT tenant, action_id, ROW_NUMBER() OVER ("
+            "  PARTITION BY tenant ORDER BY retrievals + 2 * executions DESC"
+            " ) AS rank FROM usage"
+            " WHERE tenant = '' OR tenant IN ("
+            "  SELECT tenant FROM usage GROUP BY tenant HAVING MAX(last_used) >= ?"
+            " )"
+            ") WHERE rank <= ? ORDER BY tenant, rank",
+            (active_since, limit),
+        )
+        hottest: Dict[Optional[str], List[str]] = {}
+        for tenant, action_id in rows:
+            hottest.setdefault(tenant or None, []).append(action_id)
+        return hottest
+
+    def close(self) -> None:
+        self.flush(self.take_pending())
+        self.connection.close()
+
+
+class HotTier:
+    """Pinned in-memory copy of the most used actions and their vectors, per tenant.
+
+    Answers best-match queries (best_only or top_k=1) without touching the
+    store when the closest hot action is at least `min_similarity` cosine-similar
+    to the query, and above the query's own threshold. Hybrid scores are
+    normalized over each result set and are not comparable across sets, so the
+    hot tier scores by cosine similarity; it only short-circuits near-exact
+    matches and everything else falls through to the store.
+    """
+
+    def __init__(
+        self,
+        size: int = 64,
+        min_similarity: float = 0.9,
+        refresh_interval: float = 60.0,
+        active_seconds: float = 900.0,
+    ):
+        self.size = size
+        self.min_similarity = min_similarity
+        self.refresh_interval = refresh_interval
+        # Tenants unused for longer are dropped rather than refreshed
+        self.active_seconds = active_seconds
+        # tenant -> (ids, stored properties, unit-norm float32 matrix)
+        self._tiers: Dict[Optional[str], tuple[List[str], List[Dict[str, Any]], np.ndarray]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "HotTier":
+        return cls(
+            size=int(os.getenv("HOT_TIER_SIZE", "64")),
+            min_similarity=float(os.getenv("HOT_TIER_MIN_SIMILARITY", "0.9")),
+            refresh_interval=float(os.getenv("HOT_TIER_REFRESH_SECONDS", "60")),
+            active_seconds=float(os.getenv("HOT_TIER_ACTIVE_SECONDS", "900")),
+        )
+
+    def tenants(self) -> List[Optional[str]]:
+        return list(self._tiers)
+
+    def replace(self, tenant: Optional[str], entries: List[HotEntry]) -> None:
+        if not entries:
+            self._tiers.pop(tenant, None)
+            return
+        matrix = np.asarray([vector for _, _, vector in entries], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        self._tiers[tenant] = (
+            [action_id for action_id, _, _ in entries],
+            [properties for _, properties, _ in entries],
+            matrix,
+        )
+
+    def match(self, query: RetrievalQuery, vector: List[float]) -> Optional[List[ScoredProperties]]:
+        """The single best hot action if it clears the thresholds, else None"""
+        if not (query.best_only or query.top_k == 1):
+            return None
+        tier = self._tiers.get(query.tenant)
+        if tier is None:
+            return None
+        ids, items, matrix = tier
+        query_vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query_vector))
+        if norm:
+            query_vector = query_vector / norm
+        similarities = matrix @ query_vector
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        threshold = max(self.min_similarity, query.threshold or 0.0)
+        if similarity <= threshold or (
+            query.max_vector_distance is not None
+            and 1 - similarity > query.max_vector_distance
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [(ids[best], project(items[best], query.return_properties), similarity)]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": self.size,
+            "min_similarity": self.min_similarity,
+            "entries": {tenant or "": len(ids) for tenant, (ids, _, _) in self._tiers.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,118 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+ROOT_LOGGER = "backend"
+
+# Read from the environment by configure_logging() when the first logger is created,
+# so entry points must load .env before importing the modules that create one
+# Fraction of per-request debug events (`StructuredLogger.sampled`) that are emitted
+DEBUG_SAMPLE_RATE = 0.01
+# Longer field values are cut so one large payload cannot stall the writer
+FIELD_MAX_CHARS = 512
+
+_listener: Optional[QueueListener] = None
+
+
+def truncate(value: Any, max_chars: Optional[int] = None) -> Any:
+    max_chars = max_chars or FIELD_MAX_CHARS
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}...(+{len(text) - max_chars} chars)"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, event and its fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            entry[key] = truncate(value)
+        if record.exc_info:
+            entry["exception"] = truncate(self.formatException(record.exc_info), 4096)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _PassthroughQueueHandler(QueueHandler):
+    # The stock handler formats in the caller; leave that to the listener thread
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging() -> None:
+    """Route the backend's loggers through a queue drained by a background thread.
+
+    Callers only pay for an enqueue; formatting and stdout writes happen on the
+    listener thread. Idempotent, and safe to call once per worker process.
+    """
+    global _listener, DEBUG_SAMPLE_RATE, FIELD_MAX_CHARS
+    if _listener is not None:
+        return
+    DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", str(DEBUG_SAMPLE_RATE)))
+    FIELD_MAX_CHARS = int(os.getenv("LOG_FIELD_MAX_CHARS", str(FIELD_MAX_CHARS)))
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(_PassthroughQueueHandler(log_queue))
+    root.propagate = False
+
+
+class StructuredLogger:
+    """Thin wrapper so call sites log an event name plus keyword fields:
+
+        log.info("collection_created", collection=name)
+    """
+
+    def __init__(self, name: str):
+        configure_logging()
+        self._logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+    def _log(self, level: int, event: str, fields: dict, exc_info: bool = False) -> None:
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, extra={"fields": fields}, exc_info=exc_info)
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, event, fields)
+
+    def sampled(self, event: str, **fields: Any) -> None:
+        """Debug event emitted for a DEBUG_SAMPLE_RATE fraction of calls, for per-request dumps"""
+        if self._logger.isEnabledFor(logging.DEBUG) and random.random() < DEBUG_SAMPLE_RATE:
+            self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event: str, **fields: Any) -> None:
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
@@ -1,58 +1,523 @@
-import json
-from fastapi import FastAPI
-from weaviate_service import WeaviateClient
+import asyncio
+import os
+import secrets
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from typing import List
-from models import ActionData, RetrievalRequest
 
-
-# Load environment variables from .env file
+# Load environment variables from .env file before the local modules are
+# imported: they read their settings, logging included, at import time
 load_dotenv()
 
-app = FastAPI()
-client = WeaviateClient()
+import orjson
+from admission import AdmissionController, Overloaded, SingleFlight
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import (
+    ORJSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from pydantic import ValidationError
+from logger import get_logger
+from metrics import (
+    RESULT_COUNT,
+    SERIALIZATION_LATENCY,
+    MetricsMiddleware,
+    render_metrics,
+)
+from store import (
+    ActionStore,
+    ScoredProperties,
+    StoreUnavailable,
+    project,
+    store_from_env,
+)
+from retrieval_cache import RetrievalCache, canonical_key
+from text_builder import default_text_builder
+from typing import Annotated, AsyncIterator, List, Optional, Union
+from uuid import UUID
+from models import (
+    ActionData,
+    ActionDataProjection,
+    ActionSummary,
+    BatchSubmissionFailure,
+    BatchSubmissionResult,
+    ExecutionReport,
+    ExportedAction,
+    RetrievalQuery,
+    RetrievalRequest,
+    ScoredActionData,
+    TenantInfo,
+)
+
+log = get_logger("main")
+
+MAX_SUBMIT_BATCH = int(os.getenv("MAX_SUBMIT_BATCH", "1000"))
+MAX_RETRIEVE_BATCH = int(os.getenv("MAX_RETRIEVE_BATCH", "100"))
+# Lines parsed, embedded and inserted together by /admin/import
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "100"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One store (and pooled connection) per worker, opened after startup instead of at import
+    store = store_from_env()
+    await store.connect()
+    # Warm-up: preload the hot tier from the persisted usage statistics
+    await store.refresh_hot_tier()
+    refresher = asyncio.create_task(refresh_hot_tier_periodically(store))
+    app.state.store = store
+    app.state.cache = RetrievalCache.from_env()
+    app.state.admission = AdmissionController.from_env()
+    # Concurrent identical retrievals share one store call, keyed like the cache
+    app.state.inflight = SingleFlight()
+    try:
+        yield
+    finally:
+        refresher.cancel()
+        await store.close()
+        store.usage.close()
+        app.state.cache.close()
+
+
+async def refresh_hot_tier_periodically(store: ActionStore) -> None:
+    while True:
+        await asyncio.sleep(store.hot_tier.refresh_interval)
+        try:
+            await store.refresh_hot_tier()
+        except Exception as e:
+            log.warning("hot_tier_refresh_failed", error=str(e))
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(MetricsMiddleware)
+
+
+def get_store(request: Request) -> ActionStore:
+    return request.app.state.store
+
+
+def get_cache(request: Request) -> RetrievalCache:
+    return request.app.state.cache
+
+
+def get_admission(request: Request) -> AdmissionController:
+    return request.app.state.admission
+
+
+def get_inflight(request: Request) -> SingleFlight:
+    return request.app.state.inflight
+
+
+def require_admin(authorization: Annotated[Optional[str], Header()] = None) -> None:
+    """/admin/* needs `Authorization: Bearer $ADMIN_TOKEN`, and is off without ADMIN_TOKEN"""
+    admin_token = os.getenv("ADMIN_TOKEN", "")
+    if not admin_token:
+        raise HTTPException(
+            status_code=403, detail="Admin routes are disabled, set ADMIN_TOKEN to enable them"
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode("utf-8"), admin_token.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded) -> ORJSONResponse:
+    # Fail fast so clients back off instead of queueing behind a slow store
+    return ORJSONResponse(
+        status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(StoreUnavailable)
+async def store_unavailable_handler(request: Request, exc: StoreUnavailable) -> ORJSONResponse:
+    # Never an empty 200: clients would cache "no match" and generate instead
+    return ORJSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+RetrievalResult = Union[ScoredActionData, ActionDataProjection, ActionSummary]
+
+# Optional ?tenant= on submit/retrieve; omitted means the shared collection
+TenantParam = Annotated[
+    Optional[str], Query(pattern=r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+]
+
+SUMMARY_FIELDS = ["input_json_schema", "output_json_schema"]
+
+
+def to_retrieval_query(
+    request: RetrievalRequest, tenant: Optional[str] = None
+) -> RetrievalQuery:
+    # Threshold, limits and projection are pushed down so discarded payloads are never fetched
+    if request.response_shape == "summary":
+        return_properties = SUMMARY_FIELDS
+    else:
+        return_properties = list(request.fields or ActionData.model_fields)
+    return RetrievalQuery(
+        query=default_text_builder().build(
+            request.chat_history, request.tool_description
+        ),
+        top_k=request.top_k,
+        threshold=request.threshold,
+        auto_limit=request.auto_limit,
+        max_vector_distance=request.max_vector_distance,
+        best_only=request.best_only,
+        alpha=request.alpha,
+        return_properties=return_properties,
+        tenant=tenant,
+    )
+
+
+def encode_results(scored_properties: List[ScoredProperties]) -> bytes:
+    """JSON array of results, serialized straight from the stored properties.
+
+    Stored actions were validated once on submit and the store already
+    projected them, so they are not rebuilt as pydantic models here.
+    """
+    with SERIALIZATION_LATENCY.time("response"):
+        body = orjson.dumps(
+            [
+                {
+                    "id": action_id,
+                    "score": score,
+                    **{key: value for key, value in properties.items() if value is not None},
+                }
+                for action_id, properties, score in scored_properties
+            ]
+        )
+    RESULT_COUNT.observe(len(scored_properties))
+    return body
+
+
+def json_response(body: bytes) -> Response:
+    # Returning a Response skips FastAPI's response-model validation and encoding
+    return Response(content=body, media_type="application/json")
 
 
 @app.post("/submit_action")
-async def submit_action(submission: ActionData) -> bool:
+async def submit_action(
+    submission: ActionData,
+    tenant: TenantParam = None,
+    store: ActionStore = Depends(get_store),
+    cache: RetrievalCache = Depends(get_cache),
+    admission: AdmissionController = Depends(get_admission),
+) -> bool:
     """
     1. Get embeddings for chat history
     2. Store action in Weaviate with chat history embedding
     3. Return success/failure
     """
-    # TODO: Implement embedding generation using OpenAI
-    # TODO: Store in Weaviate
-    client.add_action_data(submission)
-    return True
+    with admission.admit():
+        inserted = await store.add_action_data(submission, tenant)
+    await cache.invalidate()
+    if not inserted:
+        log.debug("duplicate_action_skipped")
+    # False when the action was merged into an existing near-duplicate
+    return inserted
+
+
+@app.post("/submit_actions")
+async def submit_actions(
+    submissions: List[ActionData],
+    tenant: TenantParam = None,
+    store: ActionStore = Depends(get_store),
+    cache: RetrievalCache = Depends(get_cache),
+    admission: AdmissionController = Depends(get_admission),
+) -> BatchSubmissionResult:
+    """
+    Bulk variant of /submit_action for seeding many actions at once.
+    Objects are imported in batches; failures are reported per list index.
+    """
+    if len(submissions) > MAX_SUBMIT_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_SUBMIT_BATCH} actions can be submitted per request",
+        )
+    with admission.admit():
+        result = await store.add_action_data_batch(submissions, tenant)
+    await cache.invalidate()
+    log.info(
+        "actions_submitted",
+        inserted=result.inserted,
+        duplicates=len(result.duplicates),
+        failed=len(result.failed),
+    )
+    return result
 
 
-@app.post("/retrieve_actions")
-async def retrieve_actions(request: RetrievalRequest) -> List[ActionData]:
+@app.post("/retrieve_actions", response_model=List[RetrievalResult])
+async def retrieve_actions(
+    request: RetrievalRequest,
+    tenant: TenantParam = None,
+    store: ActionStore = Depends(get_store),
+    cache: RetrievalCache = Depends(get_cache),
+    admission: AdmissionController = Depends(get_admission),
+    inflight: SingleFlight = Depends(get_inflight),
+) -> Response:
     """
     1. Get embeddings for input chat history
     2. Query Weaviate for similar actions
-    3. Return top k results
+    3. Return top k results, projected to `fields` or as summaries if requested
     """
-    # TODO: Implement embedding generation and retrieval
-    action_data_tuples = client.retrieve_action_data(
-        json.dumps(request.chat_history), request.top_k
-    )
-    print("action_data_tuples:\n", action_data_tuples)
-    action_data_objects = [
-        action_data_tuple[0]
-        for action_data_tuple in action_data_tuples
-        if action_data_tuple[1] > request.threshold
-    ]
-    return action_data_objects
+    cache_key = canonical_key(request, tenant)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return json_response(cached)
+
+    # Keyed by generation too, so a request sent after a write never joins a
+    # store call that started before it
+    generation = cache.generation
+
+    async def fetch() -> bytes:
+        with admission.admit():
+            scored_properties = await store.retrieve_action_data(
+                to_retrieval_query(request, tenant)
+            )
+        log.sampled(
+            "actions_retrieved",
+            results=[(action_id, score) for action_id, _, score in scored_properties],
+        )
+        body = encode_results(scored_properties)
+        cache.put(cache_key, body, generation)
+        return body
+
+    return json_response(await inflight.do(f"{generation}:{cache_key}", fetch))
+
+
+@app.post("/retrieve_actions_batch", response_model=List[List[RetrievalResult]])
+async def retrieve_actions_batch(
+    requests: List[RetrievalRequest],
+    tenant: TenantParam = None,
+    store: ActionStore = Depends(get_store),
+    cache: RetrievalCache = Depends(get_cache),
+    admission: AdmissionController = Depends(get_admission),
+    inflight: SingleFlight = Depends(get_inflight),
+) -> Response:
+    """
+    Retrieve candidates for several chat histories in one call.
+    Queries run concurrently; results are returned in request order and each
+    request keeps its own top_k and threshold.
+    """
+    if len(requests) > MAX_RETRIEVE_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_RETRIEVE_BATCH} queries can be sent per request",
+        )
+    cache_keys = [canonical_key(request, tenant) for request in requests]
+    bodies: List[Optional[bytes]] = [cache.get(key) for key in cache_keys]
+    misses = [index for index, body in enumerate(bodies) if body is None]
+    if misses:
+        generation = cache.generation
+        # single-flight key -> (cache key, request)
+        pending = {
+            f"{generation}:{cache_keys[index]}": (cache_keys[index], requests[index])
+            for index in misses
+        }
+
+        async def fetch(keys: List[str]) -> List[bytes]:
+            with admission.admit():
+                retrieved = await store.retrieve_action_data_batch(
+                    [to_retrieval_query(pending[key][1], tenant) for key in keys]
+                )
+            encoded = []
+            for key, scored_properties in zip(keys, retrieved):
+                encoded.append(encode_results(scored_properties))
+                cache.put(pending[key][0], encoded[-1], generation)
+            return encoded
+
+        fetched = await inflight.do_many(
+            [f"{generation}:{cache_keys[index]}" for index in misses], fetch
+        )
+        for index, body in zip(misses, fetched):
+            bodies[index] = body
+    # Each per-query body is already a JSON array, so they are joined as-is
+    return json_response(b"[" + b",".join(bodies) + b"]")
+
+
+@app.get("/actions/{action_id}", response_model=ActionData)
+async def get_action(
+    action_id: str,
+    tenant: TenantParam = None,
+    store: ActionStore = Depends(get_store),
+) -> Response:
+    """Full action for an id returned by a summary or projected retrieval"""
+    properties = await store.get_action_data(action_id, tenant)
+    if properties is None:
+        raise HTTPException(status_code=404, detail=f"Action '{action_id}' not found")
+    return json_response(orjson.dumps(project(properties, list(ActionData.model_fields))))
+
+
+@app.post("/actions/{action_id}/executions")
+async def report_execution(
+    action_id: UUID,
+    report: ExecutionReport,
+    tenant: TenantParam = None,
+    store: ActionStore = Depends(get_store),
+) -> bool:
+    """Count an execution of a retrieved action; the most used actions are kept hot"""
+    # Only stored actions are counted, so usage rows always name a real action
+    if await store.get_action_data(str(action_id), tenant) is None:
+        raise HTTPException(status_code=404, detail=f"Action '{action_id}' not found")
+    store.usage.record_execution(tenant, str(action_id), report.success)
+    return True
 
 
 # delete collection
 # @app.delete("/delete_collection")
-# async def delete_collection():
-#     client.delete_collection("actions")
+# async def delete_collection(store: ActionStore = Depends(get_store)):
+#     await store.delete_collection("actions")
 #     return True
 
+@app.get("/admin/tenants", dependencies=[Depends(require_admin)])
+async def list_tenants(store: ActionStore = Depends(get_store)) -> List[TenantInfo]:
+    """Tenants with their activity status and number of stored actions"""
+    return await store.list_tenants()
+
+
+@app.get("/admin/export", dependencies=[Depends(require_admin)])
+async def export_actions(
+    tenant: TenantParam = None,
+    include_vectors: bool = False,
+    store: ActionStore = Depends(get_store),
+) -> StreamingResponse:
+    """Stream the collection as NDJSON, one ExportedAction per line.
+
+    With `include_vectors` the embeddings are exported too, so that
+    /admin/import into a store using the same embedder skips re-embedding.
+    """
+
+    async def lines() -> AsyncIterator[bytes]:
+        exported = 0
+        async for action_id, properties, vector in store.iter_actions(
+            tenant, include_vectors
+        ):
+            record = {"id": action_id, "properties": properties}
+            if vector is not None:
+                record["vector"] = vector
+            yield orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+            exported += 1
+        log.info("actions_exported", tenant=tenant, exported=exported)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/admin/import", dependencies=[Depends(require_admin)])
+async def import_actions(
+    request: Request,
+    tenant: TenantParam = None,
+    overwrite: bool = False,
+    store: ActionStore = Depends(get_store),
+    cache: RetrievalCache = Depends(get_cache),
+) -> BatchSubmissionResult:
+    """Load an NDJSON export from the request body into the store.
+
+    The body is read as it arrives and inserted IMPORT_BATCH_SIZE lines at a
+    time, so memory does not grow with the size of the import. Records whose
+    id is already stored are skipped and listed in `duplicates` unless
+    `overwrite` is set. Duplicates and failures are reported by line number
+    (from 0).
+    """
+    inserted = 0
+    duplicates: List[int] = []
+    failed: List[BatchSubmissionFailure] = []
+    # (line number, record) parsed since the last insert
+    batch: List[tuple[int, ExportedAction]] = []
+
+    async def flush() -> None:
+        nonlocal inserted
+        result = await store.import_actions(
+            [record for _, record in batch], tenant, overwrite
+        )
+        inserted += result.inserted
+        duplicates.extend(batch[position][0] for position in result.duplicates)
+        failed.extend(
+            BatchSubmissionFailure(index=batch[failure.index][0], message=failure.message)
+            for failure in result.failed
+        )
+        batch.clear()
+
+    def parse(line_number: int, line: bytes) -> None:
+        if not line.strip():
+            return
+        try:
+            batch.append((line_number, ExportedAction.model_validate_json(line)))
+        except ValidationError as e:
+            failed.append(BatchSubmissionFailure(index=line_number, message=str(e)))
+
+    line_number = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            parse(line_number, line)
+            line_number += 1
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+    parse(line_number, buffer)
+    if batch:
+        await flush()
+    await cache.invalidate()
+    log.info(
+        "actions_imported",
+        tenant=tenant,
+        inserted=inserted,
+        duplicates=len(duplicates),
+        failed=len(failed),
+    )
+    return BatchSubmissionResult(inserted=inserted, duplicates=duplicates, failed=failed)
+
+
+@app.get("/cache_stats")
+async def cache_stats(cache: RetrievalCache = Depends(get_cache)) -> dict:
+    return cache.stats()
+
+
+@app.get("/admission_stats")
+async def admission_stats(
+    admission: AdmissionController = Depends(get_admission),
+    inflight: SingleFlight = Depends(get_inflight),
+) -> dict:
+    return {
+        "worker": os.getpid(),
+        "admission": admission.stats(),
+        "coalescing": inflight.stats(),
+    }
+
+
+@app.get("/hot_tier")
+async def hot_tier_stats(store: ActionStore = Depends(get_store)) -> dict:
+    return {"worker": os.getpid(), **store.hot_tier.stats()}
+
+
+@app.get("/dedup_report")
+async def dedup_report(store: ActionStore = Depends(get_store)) -> dict:
+    return {"worker": os.getpid(), **store.deduplicator.report()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    """Latency and result-count histograms in Prometheus text format"""
+    return render_metrics()
+
+
 @app.get("/health")
 async def health_check():
+    # Liveness only: the process is up and serving requests
     return True
 
+
+@app.get("/ready")
+async def readiness_check(store: ActionStore = Depends(get_store)) -> bool:
+    """Readiness: 503 until the backing store answers, so traffic is held back"""
+    if not await store.ready():
+        raise HTTPException(status_code=503, detail="Action store is not ready")
+    return True
@@ -0,0 +1,137 @@
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from starlette.routing import Match
+
+# Route template of the request being served, e.g. "/retrieve_actions"
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="none")
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(labels: Sequence[Tuple[str, object]]) -> str:
+    # Label values are route templates and fixed operation names, no escaping needed
+    return ",".join(f'{name}="{value}"' for name, value in labels)
+
+
+class Histogram:
+    """Fixed-bucket histogram, labelled by the current endpoint plus `label_names`.
+
+    Observing is a bisect and three additions; cumulative bucket counts are
+    only computed when /metrics is scraped. State is per process, so every
+    series carries a `worker` label (the pid) and each uvicorn worker reports
+    its own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # (endpoint, *labels) -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = (current_endpoint.get(), *labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self, worker: int) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            labels = [("worker", worker), *zip(("endpoint", *self.label_names), key)]
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels([*labels, ("le", bound)])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            series_labels = _format_labels(labels)
+            lines.append(f"{self.name}_sum{{{series_labels}}} {total}")
+            lines.append(f"{self.name}_count{{{series_labels}}} {count}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "backend_request_duration_seconds",
+    "Time from request received to response sent.",
+)
+STORE_LATENCY = Histogram(
+    "backend_store_duration_seconds",
+    "Time spent in the action store, by operation (embed, query, hydrate, insert, dedup).",
+    ["operation"],
+)
+SERIALIZATION_LATENCY = Histogram(
+    "backend_serialization_seconds",
+    "Time spent converting between API payloads and store objects.",
+    ["direction"],
+)
+RESULT_COUNT = Histogram(
+    "backend_retrieved_results",
+    "Actions returned per retrieval query, after thresholding.",
+    buckets=COUNT_BUCKETS,
+)
+
+REGISTRY = [REQUEST_LATENCY, STORE_LATENCY, SERIALIZATION_LATENCY, RESULT_COUNT]
+
+
+def render_metrics() -> str:
+    worker = os.getpid()
+    return "\n".join(line for histogram in REGISTRY for line in histogram.render(worker)) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times each HTTP request and tags it with its route template.
+
+    The route template (not the raw path) is used as the endpoint label so that
+    `/actions/{action_id}` stays a single series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _endpoint(self, scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_endpoint.set(self._endpoint(scope))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - start)
+            current_endpoint.reset(token)
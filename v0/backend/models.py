@@ -1,4 +1,5 @@
-from typing import Dict, List
+from typing import Dict, List, Literal, Optional
+from uuid import UUID
 from pydantic import BaseModel
 
 
@@ -8,17 +9,107 @@ class ActionData(BaseModel):
     code: str
     test: str
     chat_history: List[Dict[str, str]]  # List of chat messages
+    tool_description: Optional[str] = None
 
 
 class ActionDataWeaviate(ActionData):
     text_to_embed: str
+    fingerprint: str = ""  # Normalized code + schemas, see dedup.py
+    schema_fingerprint: str = ""
 
 
 class ActionDataWeaviateScored(ActionDataWeaviate):
     score: float
 
 
+class ScoredActionData(ActionData):
+    id: str
+    score: float
+
+
+class ActionDataProjection(BaseModel):
+    """Retrieval result restricted to the requested `fields`"""
+
+    id: str
+    score: float
+    input_json_schema: Optional[str] = None
+    output_json_schema: Optional[str] = None
+    code: Optional[str] = None
+    test: Optional[str] = None
+    chat_history: Optional[List[Dict[str, str]]] = None
+    tool_description: Optional[str] = None
+
+
+class ActionSummary(BaseModel):
+    """Lightweight retrieval result; hydrate it with GET /actions/{id}"""
+
+    id: str
+    score: float
+    input_json_schema: str
+    output_json_schema: str
+
+
+ActionField = Literal[
+    "input_json_schema",
+    "output_json_schema",
+    "code",
+    "test",
+    "chat_history",
+    "tool_description",
+]
+
+
 class RetrievalRequest(BaseModel):
     chat_history: List[Dict[str, str]]
+    tool_description: Optional[str] = None
     threshold: float = 0.9
     top_k: int = 5
+    auto_limit: Optional[int] = None  # Cut results after this many score jumps
+    max_vector_distance: Optional[float] = None
+    best_only: bool = False  # Return at most the single best match
+    alpha: Optional[float] = None  # Hybrid weight of the vector score, 1 = vector only
+    fields: Optional[List[ActionField]] = None  # Only return these properties
+    response_shape: Literal["full", "summary"] = "full"
+
+
+class RetrievalQuery(BaseModel):
+    """Store-level query; only results scoring above `threshold` are returned"""
+
+    query: str
+    top_k: int = 10
+    threshold: Optional[float] = None
+    auto_limit: Optional[int] = None
+    max_vector_distance: Optional[float] = None
+    best_only: bool = False
+    alpha: Optional[float] = None  # None uses the store's default
+    return_properties: Optional[List[str]] = None  # None returns everything stored
+    tenant: Optional[str] = None  # None queries the shared collection
+
+
+class ExecutionReport(BaseModel):
+    success: bool = True  # False when the action raised or returned invalid output
+
+
+class TenantInfo(BaseModel):
+    name: str
+    status: str  # e.g. "active" or "inactive"
+    objects: Optional[int] = None  # Not counted while the tenant is inactive
+
+
+class ExportedAction(BaseModel):
+    """One line of an NDJSON export, and of an import"""
+
+    id: Optional[UUID] = None  # Kept on import so usage statistics still apply
+    properties: ActionData
+    vector: Optional[List[float]] = None  # Re-embedded on import when missing
+
+
+class BatchSubmissionFailure(BaseModel):
+    index: int  # Position of the action in the submitted list (line for imports)
+    message: str
+
+
+class BatchSubmissionResult(BaseModel):
+    inserted: int
+    duplicates: List[int] = []  # Indices skipped as duplicates of stored actions
+    failed: List[BatchSubmissionFailure] = []
@@ -0,0 +1,365 @@
+import json
+import math
+import os
+import re
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import numpy as np
+
+from dedup import Deduplicator, schema_fingerprint
+from embeddings import Embedder, embedder_from_env
+from hot_tier import HotEntry, HotTier, UsageStats
+from metrics import STORE_LATENCY
+from models import ActionData, ActionDataWeaviate, RetrievalQuery, TenantInfo
+from store import (
+    DEFAULT_ALPHA,
+    ActionStore,
+    ScoredProperties,
+    StoredAction,
+    autocut,
+    project,
+)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# BM25 parameters, same defaults as Weaviate
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def min_max_normalize(scores: np.ndarray) -> np.ndarray:
+    """Scale scores to [0, 1] like Weaviate's relativeScoreFusion"""
+    low, high = scores.min(), scores.max()
+    if high == low:
+        return np.ones_like(scores) if high > 0 else np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+class NumpyCollection:
+    """One collection: stored properties, unit-norm float32 vectors and a BM25 index"""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.items: List[dict] = []
+        # Row-major matrix with spare capacity; only the first len(self) rows are live
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.fingerprints: Dict[str, str] = {}
+        self.rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _reserve(self, dimensions: int) -> None:
+        rows = len(self)
+        if rows == 0 and self.matrix.shape[1] != dimensions:
+            self.matrix = np.zeros((16, dimensions), dtype=np.float32)
+            self.doc_lengths = np.zeros(16, dtype=np.float32)
+        elif self.matrix.shape[1] != dimensions:
+            raise ValueError(
+                f"Vector has {dimensions} dimensions, collection uses {self.matrix.shape[1]}"
+            )
+        if rows == self.matrix.shape[0]:
+            capacity = max(16, rows * 2)
+            matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+            matrix[:rows] = self.matrix[:rows]
+            doc_lengths = np.zeros(capacity, dtype=np.float32)
+            doc_lengths[:rows] = self.doc_lengths[:rows]
+            self.matrix, self.doc_lengths = matrix, doc_lengths
+
+    def add(self, item: dict, vector: List[float], object_id: Optional[str] = None) -> str:
+        """Append an object, or replace the stored one when `object_id` exists"""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        if norm:
+            array = array / norm
+        row = self.rows.get(object_id) if object_id else None
+        if row is None:
+            self._reserve(array.shape[0])
+            row = len(self)
+        elif array.shape[0] != self.matrix.shape[1]:
+            raise ValueError(
+                f"Vector has {array.shape[0]} dimensions, collection uses {self.matrix.shape[1]}"
+            )
+        else:
+            self._unindex(row)
+        self.matrix[row] = array
+        tokens = tokenize(item["text_to_embed"])
+        for term, count in Counter(tokens).items():
+            self.postings[term][row] = count
+        self.doc_lengths[row] = len(tokens)
+        if row < len(self):
+            self.items[row] = item
+        else:
+            object_id = object_id or str(uuid.uuid4())
+            self.rows[object_id] = row
+            self.ids.append(object_id)
+            self.items.append(item)
+        if item.get("fingerprint"):
+            self.fingerprints[item["fingerprint"]] = object_id
+        return object_id
+
+    def _unindex(self, row: int) -> None:
+        """Drop a row's postings and fingerprint before it is overwritten"""
+        item = self.items[row]
+        for term in set(tokenize(item["text_to_embed"])):
+            self.postings[term].pop(row, None)
+        if self.fingerprints.get(item.get("fingerprint")) == self.ids[row]:
+            del self.fingerprints[item["fingerprint"]]
+
+    def vector_scores(self, query_vector: List[float]) -> np.ndarray:
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm:
+            query = query / norm
+        return self.matrix[: len(self)] @ query
+
+    def nearest(self, query_vector: List[float], k: int) -> List[tuple[int, float]]:
+        """Rows of the k most cosine-similar vectors, best first"""
+        if len(self) == 0 or k <= 0:
+            return []
+        scores = self.vector_scores(query_vector)
+        k = min(k, len(self))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(row), float(scores[row])) for row in ranked]
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        rows_total = len(self)
+        scores = np.zeros(rows_total, dtype=np.float32)
+        doc_lengths = self.doc_lengths[:rows_total]
+        average_length = float(doc_lengths.mean()) or 1.0
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            rows = np.fromiter(posting.keys(), dtype=np.int64, count=len(posting))
+            counts = np.fromiter(posting.values(), dtype=np.float32, count=len(posting))
+            idf = math.log(1 + (rows_total - len(posting) + 0.5) / (len(posting) + 0.5))
+            scores[rows] += idf * counts * (BM25_K1 + 1) / (
+                counts
+                + BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[rows] / average_length)
+            )
+        return scores
+
+    def hybrid(
+        self,
+        query: str,
+        query_vector: List[float],
+        top_k: int,
+        alpha: float,
+        max_vector_distance: Optional[float] = None,
+    ) -> List[tuple[int, float]]:
+        """Top-k rows by alpha * vector + (1 - alpha) * BM25, both min-max scaled"""
+        if len(self) == 0 or top_k <= 0:
+            return []
+        vector_scores = self.vector_scores(query_vector)
+        fused = alpha * min_max_normalize(vector_scores) + (
+            1 - alpha
+        ) * min_max_normalize(self.bm25_scores(query))
+        if max_vector_distance is not None:
+            # Cosine distance, as reported by Weaviate
+            fused = np.where(1 - vector_scores <= max_vector_distance, fused, -np.inf)
+        k = min(top_k, int(np.isfinite(fused).sum()))
+        if k == 0:
+            return []
+        candidates = np.argpartition(-fused, k - 1)[:k]
+        ranked = candidates[np.argsort(-fused[candidates], kind="stable")]
+        return [(int(row), float(fused[row])) for row in ranked]
+
+
+class NumpyActionStore(ActionStore):
+    """In-process store for small deployments and CI, no Weaviate required.
+
+    Collections live in memory and are written to `path` (a directory) on
+    close and by `snapshot()`, then reloaded on connect. Each tenant gets its
+    own collection named "<collection>@<tenant>".
+    """
+
+    def __init__(
+        self,
+        collection_name: str = "actions",
+        embedder: Optional[Embedder] = None,
+        path: Optional[str] = None,
+        alpha: float = DEFAULT_ALPHA,
+    ):
+        self.collection_name = collection_name
+        self.embedder = embedder or embedder_from_env()
+        self.path = path
+        self.alpha = alpha
+        self.deduplicator = Deduplicator.from_env()
+        self.usage = UsageStats.from_env()
+        self.hot_tier = HotTier.from_env()
+        self.collections: Dict[str, NumpyCollection] = {}
+
+    async def connect(self) -> None:
+        if self.path and os.path.exists(os.path.join(self.path, "collections.json")):
+            self.load()
+
+    async def close(self) -> None:
+        if self.path:
+            self.snapshot()
+        await self.embedder.aclose()
+
+    def _collection(self, collection_name: str) -> NumpyCollection:
+        if collection_name not in self.collections:
+            self.collections[collection_name] = NumpyCollection()
+        return self.collections[collection_name]
+
+    def _partition(self, tenant: Optional[str], create: bool = False) -> NumpyCollection:
+        name = self.collection_name if tenant is None else f"{self.collection_name}@{tenant}"
+        if create:
+            return self._collection(name)
+        # Reads of unknown tenants must not leave empty partitions behind
+        collection = self.collections.get(name)
+        return NumpyCollection() if collection is None else collection
+
+    async def _insert_many(
+        self,
+        weaviate_items: List[ActionDataWeaviate],
+        vectors: List[List[float]],
+        tenant: Optional[str] = None,
+        object_ids: Optional[List[Optional[str]]] = None,
+    ) -> Dict[int, str]:
+        collection = self._partition(tenant, create=True)
+        object_ids = object_ids or [None] * len(weaviate_items)
+        failures: Dict[int, str] = {}
+        for index, (weaviate_item, vector, object_id) in enumerate(
+            zip(weaviate_items, vectors, object_ids)
+        ):
+            try:
+                collection.add(weaviate_item.model_dump(), vector, object_id)
+            except ValueError as e:
+                failures[index] = str(e)
+        return failures
+
+    async def find_fingerprints(
+        self, fingerprints: List[str], tenant: Optional[str] = None
+    ) -> Dict[str, str]:
+        stored = self._partition(tenant).fingerprints
+        return {
+            fingerprint: stored[fingerprint]
+            for fingerprint in fingerprints
+            if fingerprint in stored
+        }
+
+    async def find_near_duplicate(
+        self,
+        weaviate_item: ActionDataWeaviate,
+        vector: List[float],
+        tenant: Optional[str] = None,
+    ) -> Optional[str]:
+        collection = self._partition(tenant)
+        for row, similarity in collection.nearest(vector, self.deduplicator.neighbours):
+            if similarity < self.deduplicator.similarity:
+                break
+            item = collection.items[row]
+            stored_schema = item.get("schema_fingerprint") or schema_fingerprint(
+                item["input_json_schema"], item["output_json_schema"]
+            )
+            if stored_schema == weaviate_item.schema_fingerprint:
+                return collection.ids[row]
+        return None
+
+    async def _search(
+        self, query: RetrievalQuery, vector: List[float]
+    ) -> List[ScoredProperties]:
+        collection = self._partition(query.tenant)
+        alpha = self.alpha if query.alpha is None else query.alpha
+        with STORE_LATENCY.time("query"):
+            ranked = collection.hybrid(
+                query.query, vector, query.top_k, alpha, query.max_vector_distance
+            )
+        if query.auto_limit:
+            ranked = ranked[: autocut([score for _, score in ranked], query.auto_limit)]
+        if query.threshold is not None:
+            ranked = [(row, score) for row, score in ranked if score > query.threshold]
+        if query.best_only:
+            ranked = ranked[:1]
+        return [
+            (
+                collection.ids[row],
+                project(collection.items[row], query.return_properties),
+                score,
+            )
+            for row, score in ranked
+        ]
+
+    async def fetch_with_vectors(
+        self, action_ids: List[str], tenant: Optional[str] = None
+    ) -> List[HotEntry]:
+        collection = self._partition(tenant)
+        return [
+            (action_id, collection.items[row], collection.matrix[row])
+            for action_id, row in (
+                (action_id, collection.rows.get(action_id)) for action_id in action_ids
+            )
+            if row is not None
+        ]
+
+    async def existing_ids(
+        self, action_ids: List[str], tenant: Optional[str] = None
+    ) -> Set[str]:
+        collection = self._partition(tenant)
+        return {action_id for action_id in action_ids if action_id in collection.rows}
+
+    async def iter_actions(
+        self, tenant: Optional[str] = None, include_vector: bool = False
+    ) -> AsyncIterator[StoredAction]:
+        collection = self._partition(tenant)
+        fields = list(ActionData.model_fields)
+        # Rows are only appended, so objects added during the export are skipped
+        for row in range(len(collection)):
+            vector = collection.matrix[row].tolist() if include_vector else None
+            yield collection.ids[row], project(collection.items[row], fields), vector
+
+    async def get_action_data(
+        self, action_id: str, tenant: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        collection = self._partition(tenant)
+        row = collection.rows.get(action_id)
+        return None if row is None else collection.items[row]
+
+    async def list_tenants(self) -> List[TenantInfo]:
+        prefix = f"{self.collection_name}@"
+        return [
+            TenantInfo(name=name[len(prefix) :], status="active", objects=len(collection))
+            for name, collection in sorted(self.collections.items())
+            if name.startswith(prefix)
+        ]
+
+    async def delete_collection(self, collection_name: str) -> None:
+        if collection_name not in self.collections:
+            raise ValueError(f"Collection '{collection_name}' does not exist")
+        del self.collections[collection_name]
+
+    def snapshot(self) -> None:
+        """Write every collection to `path` (items as JSON, vectors as .npy)"""
+        os.makedirs(self.path, exist_ok=True)
+        manifest = {}
+        for name, collection in self.collections.items():
+            np.save(
+                os.path.join(self.path, f"{name}.npy"),
+                collection.matrix[: len(collection)],
+            )
+            manifest[name] = {"ids": collection.ids, "items": collection.items}
+        manifest_path = os.path.join(self.path, "collections.json")
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def load(self) -> None:
+        with open(os.path.join(self.path, "collections.json"), "r") as f:
+            manifest = json.load(f)
+        self.collections = {}
+        for name, stored in manifest.items():
+            matrix = np.load(os.path.join(self.path, f"{name}.npy"))
+            collection = self._collection(name)
+            for object_id, item, vector in zip(stored["ids"], stored["items"], matrix):
+                collection.add(item, vector, object_id=object_id)
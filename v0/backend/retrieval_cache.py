@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from models import RetrievalRequest
+
+
+def canonical_key(request: RetrievalRequest, tenant: Optional[str] = None) -> str:
+    """Hash of the retrieval inputs, insensitive to key order and whitespace runs"""
+    params = request.model_dump()
+    params["tenant"] = tenant
+    params["chat_history"] = [
+        {
+            key: " ".join(value.split()) if isinstance(value, str) else value
+            for key, value in message.items()
+        }
+        for message in request.chat_history
+    ]
+    payload = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SharedGeneration:
+    """Invalidation counter in SQLite, shared by every worker using `path`.
+
+    Reads are a single-row select on the event loop; `bump()` writes and is
+    meant to run in a thread. Each has its own connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._reader.execute("PRAGMA journal_mode=WAL")
+        self._reader.execute(
+            "CREATE TABLE IF NOT EXISTS generation ("
+            " id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL)"
+        )
+        self._reader.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0)")
+        self._reader.commit()
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+
+    def read(self) -> int:
+        return self._reader.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+
+    def bump(self) -> int:
+        with self._writer:
+            self._writer.execute("UPDATE generation SET value = value + 1 WHERE id = 0")
+            return self._writer.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+
+    def close(self) -> None:
+        self._reader.close()
+        self._writer.close()
+
+
+class RetrievalCache:
+    """LRU + TTL cache of JSON-encoded retrieval results, bounded by entry count and bytes.
+
+    Any write to the store calls `invalidate()`, so cached results never hide
+    a newly submitted action. Invalidating also bumps `generation`: a result
+    fetched before a write is dropped by `put()` instead of being cached.
+    With a `shared` generation, a write in any worker invalidates every
+    worker's cache on its next lookup.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 300.0,
+        shared: Optional[SharedGeneration] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (expires_at, encoded results)
+        self._entries: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_writes = 0
+        self.generation = 0
+        self.shared = shared
+        self._shared_seen = shared.read() if shared is not None else 0
+
+    @classmethod
+    def from_env(cls) -> "RetrievalCache":
+        path = os.getenv("RETRIEVAL_CACHE_GENERATION_PATH", "retrieval_cache.sqlite3")
+        return cls(
+            max_entries=int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("RETRIEVAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl=float(os.getenv("RETRIEVAL_CACHE_TTL", "300")),
+            shared=SharedGeneration(path) if path else None,
+        )
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        self.invalidations += 1
+        self.generation += 1
+
+    def _sync(self) -> None:
+        """Clear the cache if another worker has invalidated it since the last check"""
+        if self.shared is None:
+            return
+        shared = self.shared.read()
+        if shared != self._shared_seen:
+            self._shared_seen = shared
+            self._clear()
+
+    def get(self, key: str) -> Optional[bytes]:
+        self._sync()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, results = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return results
+
+    def put(self, key: str, results: bytes, generation: int) -> None:
+        """Cache `results`, fetched when the cache was at `generation`"""
+        self._sync()
+        if generation != self.generation:
+            # The store was written to while these results were being fetched
+            self.stale_writes += 1
+            return
+        if self.max_entries <= 0 or len(results) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, results)
+        self._bytes += len(results)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def invalidate(self) -> None:
+        self._clear()
+        if self.shared is None:
+            return
+        shared = await asyncio.to_thread(self.shared.bump)
+        if shared != self._shared_seen + 1:
+            # Another worker wrote too; results put while bumping may predate it
+            self._clear()
+        self._shared_seen = shared
+
+    def close(self) -> None:
+        if self.shared is not None:
+            self.shared.close()
+
+    def _remove(self, key: str) -> None:
+        _, results = self._entries.pop(key)
+        self._bytes -= len(results)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "worker": os.getpid(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_writes": self.stale_writes,
+            "generation": self.generation,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
@@ -1,8 +1,8 @@
 import os
 import sys
-import time
 import uvicorn
 from dotenv import load_dotenv
+from run_prod import wait_for_weaviate
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,9 +15,8 @@ HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
 PORT = int(os.getenv("BACKEND_PORT", "8000"))
 
 if __name__ == "__main__":
-    # Wait for other services (like Weaviate) to be ready
-    print("Waiting 3 seconds for services to be ready...")
-    time.sleep(3)
+    # Development server: single process with autoreload, see run_prod.py for serving
+    wait_for_weaviate()
 
     print(f"Starting backend server on {HOST}:{PORT}")
     uvicorn.run(
@@ -1,6 +1,7 @@
 import os
 import sys
 import time
+import httpx
 import uvicorn
 from dotenv import load_dotenv
 
@@ -13,13 +14,46 @@ load_dotenv()
 # Get configuration from environment variables
 HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
 PORT = int(os.getenv("BACKEND_PORT", "8000"))
+# One worker per core by default; each worker opens its own store connection in the lifespan.
+# Writes invalidate every worker's retrieval cache through RETRIEVAL_CACHE_GENERATION_PATH.
+WORKERS = int(os.getenv("BACKEND_WORKERS", "0")) or os.cpu_count() or 1
+# Seconds in-flight requests get to finish on SIGTERM before workers are stopped
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("BACKEND_GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+READY_TIMEOUT = float(os.getenv("WEAVIATE_READY_TIMEOUT", "60"))
+
+
+def wait_for_weaviate(timeout: float = READY_TIMEOUT, interval: float = 0.5) -> None:
+    """Poll Weaviate's readiness probe until it answers 200, or exit after `timeout` seconds"""
+    if os.getenv("ACTION_STORE", "weaviate") != "weaviate":
+        return
+    url = "{scheme}://{host}:{port}/v1/.well-known/ready".format(
+        scheme=os.getenv("WEAVIATE_SCHEME", "http"),
+        host=os.getenv("WEAVIATE_HOST", "localhost"),
+        port=os.getenv("WEAVIATE_PORT", "8080"),
+    )
+    deadline = time.monotonic() + timeout
+    print(f"Waiting for Weaviate at {url}...")
+    while True:
+        try:
+            if httpx.get(url, timeout=interval * 4).status_code == 200:
+                print("Weaviate is ready")
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() >= deadline:
+            sys.exit(f"Weaviate was not ready after {timeout:.0f} seconds")
+        time.sleep(interval)
+
 
 if __name__ == "__main__":
-    # Wait for other services (like Weaviate) to be ready
-    print("Waiting 5 seconds for services to be ready...")
-    time.sleep(5)
+    wait_for_weaviate()
 
-    print(f"Starting backend server on {HOST}:{PORT}")
+    print(f"Starting backend server on {HOST}:{PORT} with {WORKERS} workers")
     uvicorn.run(
-        "main:app", host=HOST, port=PORT, reload=False  # Disable reload in production
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=WORKERS,
+        reload=False,  # Disable reload in production
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
     )
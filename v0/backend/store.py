@@ -0,0 +1,390 @@
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Set
+
+from dedup import Deduplicator, action_fingerprint, schema_fingerprint
+from embeddings import Embedder
+from logger import get_logger
+from metrics import SERIALIZATION_LATENCY, STORE_LATENCY
+from models import (
+    ActionData,
+    ActionDataWeaviate,
+    BatchSubmissionFailure,
+    BatchSubmissionResult,
+    ExportedAction,
+    RetrievalQuery,
+    TenantInfo,
+)
+from text_builder import default_text_builder
+
+if TYPE_CHECKING:
+    from hot_tier import HotEntry, HotTier, UsageStats
+
+log = get_logger("store")
+
+# Hybrid weight of the vector score when a query sets none, Weaviate's default
+DEFAULT_ALPHA = 0.7
+
+# (id, stored properties, score) as returned by ActionStore retrievals
+ScoredProperties = tuple[str, Dict[str, Any], float]
+# (id, stored properties, vector or None) as yielded by ActionStore.iter_actions
+StoredAction = tuple[str, Dict[str, Any], Optional[List[float]]]
+
+
+class StoreUnavailable(Exception):
+    """Embedding or searching failed, so no results can be given for the query"""
+
+
+def project(properties: Dict[str, Any], names: Optional[List[str]]) -> Dict[str, Any]:
+    if names is None:
+        return properties
+    return {name: properties[name] for name in names if name in properties}
+
+
+def action_data_to_weaviate_item(action_data: ActionData) -> ActionDataWeaviate:
+    schema_hash = schema_fingerprint(
+        action_data.input_json_schema, action_data.output_json_schema
+    )
+    # action_data was validated by the endpoint; the derived fields are built here
+    return ActionDataWeaviate.model_construct(
+        **dict(action_data),
+        text_to_embed=default_text_builder().build(
+            action_data.chat_history, action_data.tool_description
+        ),
+        fingerprint=action_fingerprint(action_data.code, schema_hash),
+        schema_fingerprint=schema_hash,
+    )
+
+
+class ActionStore:
+    """Storage backend used by the API: Weaviate or the in-process NumPy store.
+
+    Subclasses set `embedder`, `deduplicator`, `usage` and `hot_tier` and
+    implement `_insert_many`, `find_fingerprints`, `find_near_duplicate`, `_search`,
+    `fetch_with_vectors` and `iter_actions`; embedding, duplicate rejection,
+    usage counting, hot-tier lookups and imports are shared here.
+    Every operation takes an optional `tenant`: None is the shared collection,
+    otherwise the tenant's own partition is used and searched alone.
+    """
+
+    embedder: Embedder
+    deduplicator: Deduplicator
+    usage: "UsageStats"
+    hot_tier: "HotTier"
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def ready(self) -> bool:
+        """Whether the backing store can serve queries right now"""
+        return True
+
+    async def _insert_many(
+        self,
+        weaviate_items: List[ActionDataWeaviate],
+        vectors: List[List[float]],
+        tenant: Optional[str] = None,
+        object_ids: Optional[List[Optional[str]]] = None,
+    ) -> Dict[int, str]:
+        """Store items with their vectors; returns {position: error} for failures.
+
+        Items are given the matching `object_ids` entry as id when it is set,
+        replacing any stored object with that id, and a fresh id otherwise.
+        """
+        raise NotImplementedError
+
+    async def find_fingerprints(
+        self, fingerprints: List[str], tenant: Optional[str] = None
+    ) -> Dict[str, str]:
+        """{fingerprint: id} of stored actions with one of the given fingerprints"""
+        raise NotImplementedError
+
+    async def find_near_duplicate(
+        self,
+        weaviate_item: ActionDataWeaviate,
+        vector: List[float],
+        tenant: Optional[str] = None,
+    ) -> Optional[str]:
+        """Id of a stored action with the same schemas and a similar embedding, if any"""
+        raise NotImplementedError
+
+    async def _find_duplicates(
+        self,
+        weaviate_items: List[ActionDataWeaviate],
+        vectors: List[List[float]],
+        tenant: Optional[str] = None,
+    ) -> List[int]:
+        """Positions of items that duplicate a stored action or an earlier item"""
+        duplicates: List[int] = []
+        first_seen: Dict[str, int] = {}
+        for index, weaviate_item in enumerate(weaviate_items):
+            if weaviate_item.fingerprint in first_seen:
+                duplicates.append(index)
+            else:
+                first_seen[weaviate_item.fingerprint] = index
+        stored = await self.find_fingerprints(list(first_seen), tenant)
+        candidates = []
+        for fingerprint, index in first_seen.items():
+            if fingerprint in stored:
+                duplicates.append(index)
+            else:
+                candidates.append(index)
+
+        semaphore = asyncio.Semaphore(max(self.deduplicator.concurrency, 1))
+
+        async def near_duplicate(index: int) -> Optional[str]:
+            async with semaphore:
+                return await self.find_near_duplicate(
+                    weaviate_items[index], vectors[index], tenant
+                )
+
+        matches = await asyncio.gather(*(near_duplicate(index) for index in candidates))
+        duplicates.extend(index for index, match in zip(candidates, matches) if match)
+        return sorted(duplicates)
+
+    async def add_action_data(
+        self, action_data: ActionData, tenant: Optional[str] = None
+    ) -> bool:
+        """Returns False when the action was skipped as a duplicate"""
+        result = await self.add_action_data_batch([action_data], tenant)
+        if result.failed:
+            raise ValueError(result.failed[0].message)
+        return result.inserted == 1
+
+    async def add_action_data_batch(
+        self, action_datas: List[ActionData], tenant: Optional[str] = None
+    ) -> BatchSubmissionResult:
+        with SERIALIZATION_LATENCY.time("encode"):
+            weaviate_items = [
+                action_data_to_weaviate_item(action_data) for action_data in action_datas
+            ]
+        with STORE_LATENCY.time("embed"):
+            vectors = await self.embedder.aembed(
+                [item.text_to_embed for item in weaviate_items]
+            )
+        duplicates: List[int] = []
+        if self.deduplicator.enabled:
+            self.deduplicator.checked += len(weaviate_items)
+            with STORE_LATENCY.time("dedup"):
+                duplicates = await self._find_duplicates(weaviate_items, vectors, tenant)
+            for index in duplicates:
+                self.deduplicator.record_duplicate(
+                    len(weaviate_items[index].model_dump_json()), len(vectors[index])
+                )
+        skipped = set(duplicates)
+        pending = [index for index in range(len(weaviate_items)) if index not in skipped]
+
+        with STORE_LATENCY.time("insert"):
+            failures = await self._insert_many(
+                [weaviate_items[index] for index in pending],
+                [vectors[index] for index in pending],
+                tenant,
+            )
+        return BatchSubmissionResult(
+            inserted=len(pending) - len(failures),
+            duplicates=duplicates,
+            failed=[
+                BatchSubmissionFailure(index=pending[position], message=message)
+                for position, message in sorted(failures.items())
+            ],
+        )
+
+    def iter_actions(
+        self, tenant: Optional[str] = None, include_vector: bool = False
+    ) -> AsyncIterator[StoredAction]:
+        """Every stored action, read page by page so memory stays bounded"""
+        raise NotImplementedError
+
+    async def existing_ids(
+        self, action_ids: List[str], tenant: Optional[str] = None
+    ) -> Set[str]:
+        """The given ids that are already stored"""
+        raise NotImplementedError
+
+    async def import_actions(
+        self,
+        records: List[ExportedAction],
+        tenant: Optional[str] = None,
+        overwrite: bool = False,
+    ) -> BatchSubmissionResult:
+        """Insert one batch of exported actions, reported by position in `records`.
+
+        Records keep their ids and, when present, their vectors, so a restore
+        with the same embedder does not re-embed. Near-duplicate rejection is
+        skipped since an export is already deduplicated, but a record whose id
+        is already stored is skipped as a duplicate unless `overwrite` is set.
+        """
+        duplicates: List[int] = []
+        record_ids = [None if record.id is None else str(record.id) for record in records]
+        if not overwrite:
+            ids = [record_id for record_id in record_ids if record_id]
+            existing = await self.existing_ids(ids, tenant) if ids else set()
+            kept = []
+            for position, record_id in enumerate(record_ids):
+                if record_id and record_id in existing:
+                    duplicates.append(position)
+                else:
+                    kept.append(position)
+                    if record_id:
+                        # A later record with the same id would overwrite this one
+                        existing.add(record_id)
+        else:
+            kept = list(range(len(records)))
+        records = [records[position] for position in kept]
+        record_ids = [record_ids[position] for position in kept]
+        with SERIALIZATION_LATENCY.time("encode"):
+            weaviate_items = [
+                action_data_to_weaviate_item(record.properties) for record in records
+            ]
+        vectors = [record.vector for record in records]
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with STORE_LATENCY.time("embed"):
+                embedded = await self.embedder.aembed(
+                    [weaviate_items[index].text_to_embed for index in missing]
+                )
+            for index, vector in zip(missing, embedded):
+                vectors[index] = vector
+        with STORE_LATENCY.time("insert"):
+            failures = await self._insert_many(
+                weaviate_items, vectors, tenant, record_ids
+            )
+        return BatchSubmissionResult(
+            inserted=len(records) - len(failures),
+            duplicates=duplicates,
+            failed=[
+                BatchSubmissionFailure(index=kept[position], message=message)
+                for position, message in sorted(failures.items())
+            ],
+        )
+
+    async def _search(
+        self, query: RetrievalQuery, vector: List[float]
+    ) -> List[ScoredProperties]:
+        """Hybrid search of the store for an already embedded query"""
+        raise NotImplementedError
+
+    async def fetch_with_vectors(
+        self, action_ids: List[str], tenant: Optional[str] = None
+    ) -> List["HotEntry"]:
+        """Stored properties and vectors of the given actions, for the hot tier"""
+        raise NotImplementedError
+
+    async def _retrieve(
+        self, query: RetrievalQuery, vector: List[float]
+    ) -> List[ScoredProperties]:
+        results = self.hot_tier.match(query, vector)
+        if results is None:
+            results = await self._search(query, vector)
+        self.usage.record_retrievals(
+            query.tenant, [action_id for action_id, _, _ in results]
+        )
+        return results
+
+    async def retrieve_action_data(
+        self, query: RetrievalQuery
+    ) -> List[ScoredProperties]:
+        [results] = await self.retrieve_action_data_batch([query])
+        return results
+
+    async def retrieve_action_data_batch(
+        self, queries: List[RetrievalQuery]
+    ) -> List[List[ScoredProperties]]:
+        """Run several searches concurrently, results in input order.
+
+        Raises StoreUnavailable if any of them fails: an empty result would
+        read as "no match" and send clients off to generate a new action.
+        """
+        # One embedding call (and cache lookup) for every query in the batch
+        try:
+            with STORE_LATENCY.time("embed"):
+                vectors = await self.embedder.aembed([query.query for query in queries])
+        except Exception as e:
+            log.error("retrieve_failed", error=str(e), queries=len(queries))
+            raise StoreUnavailable(f"Embedding failed: {e}") from e
+        results = await asyncio.gather(
+            *(self._retrieve(query, vector) for query, vector in zip(queries, vectors)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                log.error("retrieve_failed", error=str(result), queries=len(queries))
+                raise StoreUnavailable(f"Search failed: {result}") from result
+        return results
+
+    async def refresh_hot_tier(self) -> None:
+        """Flush usage counts, then reload the hot tier with the most used actions.
+
+        Called once at startup as a warm-up and then every refresh interval.
+        Only tenants used within the hot tier's `active_seconds` are reloaded,
+        so the refresh never keeps an idle tenant loaded in the store.
+        """
+        await asyncio.to_thread(self.usage.flush, self.usage.take_pending())
+        if self.hot_tier.size <= 0:
+            return
+        hottest = await asyncio.to_thread(
+            self.usage.hottest,
+            self.hot_tier.size,
+            time.time() - self.hot_tier.active_seconds,
+        )
+        for tenant in set(self.hot_tier.tenants()) - set(hottest):
+            self.hot_tier.replace(tenant, [])
+        for tenant, action_ids in hottest.items():
+            try:
+                entries = await self.fetch_with_vectors(action_ids, tenant)
+            except Exception as e:
+                log.warning("hot_tier_refresh_failed", tenant=tenant, error=str(e))
+                continue
+            self.hot_tier.replace(tenant, entries)
+
+    async def get_action_data(
+        self, action_id: str, tenant: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Stored properties of one action, None if it does not exist"""
+        raise NotImplementedError
+
+    async def list_tenants(self) -> List[TenantInfo]:
+        raise NotImplementedError
+
+    async def delete_collection(self, collection_name: str) -> None:
+        raise NotImplementedError
+
+
+def autocut(scores: List[float], cut_off: int) -> int:
+    """Number of leading results to keep, cutting at the `cut_off`-th score jump.
+
+    Mirrors Weaviate's autocut: scores (sorted descending) are scaled to [0, 1]
+    and compared to a straight line; every local maximum of the gap is a jump.
+    """
+    if len(scores) <= 1 or scores[0] == scores[-1]:
+        return len(scores)
+    step = 1.0 / (len(scores) - 1)
+    gaps = [
+        (1.0 - i * step) - (score - scores[-1]) / (scores[0] - scores[-1])
+        for i, score in enumerate(scores)
+    ]
+    jumps = 0
+    for i in range(1, len(gaps) - 1):
+        if gaps[i] > gaps[i - 1] and gaps[i] >= gaps[i + 1]:
+            jumps += 1
+            if jumps >= cut_off:
+                return i
+    return len(scores)
+
+
+def store_from_env() -> ActionStore:
+    """ACTION_STORE=weaviate|numpy"""
+    name = os.getenv("ACTION_STORE", "weaviate")
+    if name == "weaviate":
+        from weaviate_service import AsyncWeaviateClient
+
+        return AsyncWeaviateClient()
+    if name == "numpy":
+        from numpy_store import NumpyActionStore
+
+        return NumpyActionStore(path=os.getenv("NUMPY_STORE_PATH") or None)
+    raise ValueError(f"Unknown action store '{name}', expected 'weaviate' or 'numpy'")
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+import pytest
+import pytest_asyncio
+
+# The backend modules import each other as top-level modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ACTION_DATAS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "client",
+    "populate",
+    "action_datas.json",
+)
+
+
+@pytest.fixture
+def actions() -> list:
+    with open(ACTION_DATAS_PATH) as f:
+        return json.load(f)[:6]
+
+
+@pytest.fixture
+def action(actions) -> dict:
+    return actions[0]
+
+
+@pytest_asyncio.fixture
+async def backend(monkeypatch, tmp_path):
+    """The app on the NumPy store, with a search that waits for `release`"""
+    monkeypatch.setenv("ACTION_STORE", "numpy")
+    monkeypatch.setenv("EMBEDDER", "local")
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setenv("USAGE_STATS_PATH", str(tmp_path / "usage.sqlite3"))
+    monkeypatch.setenv(
+        "RETRIEVAL_CACHE_GENERATION_PATH", str(tmp_path / "retrieval_cache.sqlite3")
+    )
+    monkeypatch.setenv("NUMPY_STORE_PATH", "")
+    from main import app
+    from numpy_store import NumpyActionStore
+
+    release = asyncio.Event()
+    release.set()
+    search = NumpyActionStore._search
+
+    async def gated_search(self, query, vector):
+        await release.wait()
+        return await search(self, query, vector)
+
+    monkeypatch.setattr(NumpyActionStore, "_search", gated_search)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client, release
@@ -0,0 +1,67 @@
+import json
+import uuid
+
+import pytest
+
+ADMIN = {"Authorization": "Bearer secret"}
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+
+
+@pytest.mark.asyncio
+async def test_admin_routes_need_the_token(backend, monkeypatch):
+    client, _ = backend
+    routes = [("GET", "/admin/tenants"), ("GET", "/admin/export"), ("POST", "/admin/import")]
+    for method, path in routes:
+        assert (await client.request(method, path)).status_code == 401
+        wrong = {"Authorization": "Bearer wrong"}
+        assert (await client.request(method, path, headers=wrong)).status_code == 401
+    assert (await client.get("/admin/tenants", headers=ADMIN)).status_code == 200
+
+    monkeypatch.delenv("ADMIN_TOKEN")
+    assert (await client.get("/admin/tenants", headers=ADMIN)).status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_import_keeps_stored_ids_unless_overwrite(backend, action):
+    client, _ = backend
+    assert (await client.post("/submit_action", json=action)).json() is True
+    [record] = [
+        json.loads(line)
+        for line in (await client.get("/admin/export", headers=ADMIN)).text.splitlines()
+    ]
+    replaced = dict(record, properties=dict(record["properties"], code="def action():\n    pass\n"))
+    body = json.dumps(replaced) + "\n" + json.dumps(dict(replaced, id=None))
+
+    result = (await client.post("/admin/import", content=body, headers=ADMIN)).json()
+    assert result == {"inserted": 1, "duplicates": [0], "failed": []}
+    stored = (await client.get(f"/actions/{record['id']}")).json()
+    assert stored["code"] == action["code"]
+
+    result = (
+        await client.post("/admin/import?overwrite=true", content=body, headers=ADMIN)
+    ).json()
+    assert result == {"inserted": 2, "duplicates": [], "failed": []}
+    stored = (await client.get(f"/actions/{record['id']}")).json()
+    assert stored["code"] == replaced["properties"]["code"]
+
+
+@pytest.mark.asyncio
+async def test_import_reports_a_malformed_id_as_a_failed_line(backend, actions):
+    client, _ = backend
+    records = [
+        {"id": "not-a-uuid", "properties": actions[0]},
+        {"id": str(uuid.uuid4()), "properties": actions[1]},
+        {"properties": actions[2]},
+    ]
+    body = "\n".join(json.dumps(record) for record in records)
+
+    result = (await client.post("/admin/import", content=body, headers=ADMIN)).json()
+    assert result["inserted"] == 2 and result["duplicates"] == []
+    assert [failure["index"] for failure in result["failed"]] == [0]
+    exported = (await client.get("/admin/export", headers=ADMIN)).text.splitlines()
+    ids = [json.loads(line)["id"] for line in exported]
+    assert len(ids) == 2 and records[1]["id"] in ids
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Overloaded, SingleFlight
+
+
+def test_admission_rejects_beyond_limit():
+    admission = AdmissionController(max_inflight=2)
+    with admission.admit(), admission.admit():
+        with pytest.raises(Overloaded):
+            with admission.admit():
+                pass
+        assert admission.inflight == 2
+    assert admission.stats() == {
+        "max_inflight": 2, "inflight": 0, "admitted": 2, "rejected": 1
+    }
+
+
+def test_admission_releases_on_error():
+    admission = AdmissionController(max_inflight=1)
+    with pytest.raises(RuntimeError):
+        with admission.admit():
+            raise RuntimeError("store failed")
+    with admission.admit():
+        assert admission.inflight == 1
+
+
+def test_admission_zero_admits_everything():
+    admission = AdmissionController(max_inflight=0)
+    with admission.admit(), admission.admit(), admission.admit():
+        assert admission.inflight == 3
+    assert admission.rejected == 0
+
+
+class SlowFetch:
+    """Counts calls and holds each one until `release` is set"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, result="result"):
+        self.calls += 1
+        await self.release.wait()
+        return result
+
+
+@pytest.mark.asyncio
+async def test_singleflight_coalesces_concurrent_calls():
+    inflight = SingleFlight()
+    fetch = SlowFetch()
+    callers = [asyncio.ensure_future(inflight.do("key", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    fetch.release.set()
+    assert await asyncio.gather(*callers) == ["result"] * 5
+    assert fetch.calls == 1
+    assert inflight.stats() == {"inflight": 0, "started": 1, "coalesced": 4}
+
+
+@pytest.mark.asyncio
+async def test_singleflight_forgets_finished_keys():
+    inflight = SingleFlight()
+    fetch = SlowFetch()
+    fetch.release.set()
+    await inflight.do("key", fetch)
+    await inflight.do("key", fetch)
+    assert fetch.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_singleflight_do_many_fetches_only_new_keys():
+    inflight = SingleFlight()
+    release = asyncio.Event()
+    fetched = []
+
+    async def fetch(keys):
+        fetched.append(list(keys))
+        await release.wait()
+        return [key.upper() for key in keys]
+
+    first = asyncio.ensure_future(inflight.do_many(["a", "b"], fetch))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(inflight.do_many(["b", "c", "c"], fetch))
+    await asyncio.sleep(0)
+    release.set()
+    assert await first == ["A", "B"]
+    assert await second == ["B", "C", "C"]
+    assert fetched == [["a", "b"], ["c"]]
+
+
+@pytest.mark.asyncio
+async def test_singleflight_propagates_errors_and_retries():
+    inflight = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("store failed")
+
+    callers = [asyncio.ensure_future(inflight.do("key", failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    fetch = SlowFetch()
+    fetch.release.set()
+    assert await inflight.do("key", fetch) == "result"
+
+
+@pytest.mark.asyncio
+async def test_singleflight_cancelled_caller_does_not_cancel_others():
+    inflight = SingleFlight()
+    fetch = SlowFetch()
+    first = asyncio.ensure_future(inflight.do("key", fetch))
+    second = asyncio.ensure_future(inflight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    fetch.release.set()
+    assert await second == "result"
+    assert first.cancelled()
+    assert fetch.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_retrieval_after_submit_does_not_join_earlier_flight(backend, action):
+    client, release = backend
+    request = {"chat_history": action["chat_history"], "top_k": 1, "threshold": 0.0}
+
+    release.clear()
+    before = asyncio.ensure_future(client.post("/retrieve_actions", json=request))
+    await asyncio.sleep(0.05)
+    assert (await client.post("/submit_action", json=action)).json() is True
+    after = asyncio.ensure_future(client.post("/retrieve_actions", json=request))
+    await asyncio.sleep(0.05)
+    release.set()
+
+    await before
+    assert len((await after).json()) == 1
+    # The result fetched before the submit was not cached
+    assert len((await client.post("/retrieve_actions", json=request)).json()) == 1
+    stats = (await client.get("/admission_stats")).json()["coalescing"]
+    assert stats["coalesced"] == 0
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from numpy_store import NumpyActionStore
+
+
+@pytest.mark.asyncio
+async def test_batch_skips_stored_and_repeated_actions(backend, actions):
+    client, _ = backend
+    first = (await client.post("/submit_actions", json=actions[:2] + actions[:1])).json()
+    assert first["inserted"] == 2 and first["duplicates"] == [2]
+
+    second = (await client.post("/submit_actions", json=actions[1:3] + actions[:1])).json()
+    assert second["inserted"] == 1 and second["duplicates"] == [0, 2]
+
+
+@pytest.mark.asyncio
+async def test_neighbour_searches_run_concurrently_up_to_the_limit(backend, actions, monkeypatch):
+    client, _ = backend
+    from main import app
+
+    app.state.store.deduplicator.concurrency = 2
+    running, peak = 0, 0
+    find_near_duplicate = NumpyActionStore.find_near_duplicate
+
+    async def slow_find_near_duplicate(self, weaviate_item, vector, tenant=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return await find_near_duplicate(self, weaviate_item, vector, tenant)
+
+    monkeypatch.setattr(NumpyActionStore, "find_near_duplicate", slow_find_near_duplicate)
+    result = (await client.post("/submit_actions", json=actions)).json()
+    assert result["inserted"] + len(result["duplicates"]) == len(actions)
+    assert peak == 2
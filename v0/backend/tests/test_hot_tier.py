@@ -0,0 +1,39 @@
+import time
+import uuid
+
+import pytest
+
+from hot_tier import UsageStats
+
+
+def test_hottest_skips_idle_tenants():
+    usage = UsageStats()
+    usage.record_retrievals("idle", ["a"])
+    usage.record_retrievals(None, ["shared"])
+    usage.flush(usage.take_pending())
+    cutoff = time.time() + 1
+    usage.record_retrievals("busy", ["b", "b", "c"])
+    usage.flush(usage.take_pending())
+    usage.connection.execute("UPDATE usage SET last_used = ? WHERE tenant = 'busy'", (cutoff,))
+
+    assert usage.hottest(10, active_since=cutoff) == {None: ["shared"], "busy": ["b", "c"]}
+    assert set(usage.hottest(10)) == {None, "idle", "busy"}
+
+
+@pytest.mark.asyncio
+async def test_executions_are_only_counted_for_stored_actions(backend, action):
+    client, _ = backend
+    from main import app
+
+    store = app.state.store
+    assert (await client.post("/submit_action", json=action)).json() is True
+    [(action_id, _, _)] = [stored async for stored in store.iter_actions()]
+    report = {"success": True}
+
+    assert (await client.post("/actions/foo/executions", json=report)).status_code == 422
+    missing = await client.post(f"/actions/{uuid.uuid4()}/executions", json=report)
+    assert missing.status_code == 404
+    assert (await client.post(f"/actions/{action_id}/executions", json=report)).json() is True
+
+    store.usage.flush(store.usage.take_pending())
+    assert store.usage.hottest(10) == {None: [action_id]}
@@ -0,0 +1,58 @@
+import pytest
+
+from numpy_store import NumpyActionStore
+from retrieval_cache import RetrievalCache, SharedGeneration
+
+
+@pytest.mark.asyncio
+async def test_put_drops_results_fetched_before_invalidation():
+    cache = RetrievalCache()
+    generation = cache.generation
+    await cache.invalidate()
+    cache.put("key", b"[]", generation)
+    assert cache.get("key") is None
+    cache.put("key", b"[]", cache.generation)
+    assert cache.get("key") == b"[]"
+    assert cache.stats()["stale_writes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "generation.sqlite3")
+    first = RetrievalCache(shared=SharedGeneration(path))
+    second = RetrievalCache(shared=SharedGeneration(path))
+    second.put("key", b"[]", second.generation)
+    generation = second.generation
+
+    await first.invalidate()
+    # A result fetched before the other worker's write is not cached either
+    second.put("other", b"[]", generation)
+    assert second.get("key") is None
+    assert second.get("other") is None
+    second.put("key", b"[]", second.generation)
+    assert second.get("key") == b"[]"
+
+    await second.invalidate()
+    assert first.get("key") is None
+    assert first.generation == 2
+
+
+@pytest.mark.asyncio
+async def test_store_errors_are_503_and_not_cached(backend, action, monkeypatch):
+    client, _ = backend
+    request = {"chat_history": action["chat_history"], "top_k": 1, "threshold": 0.0}
+    assert (await client.post("/submit_action", json=action)).json() is True
+
+    search = NumpyActionStore._search
+
+    async def failing_search(self, query, vector):
+        raise ConnectionError("store is down")
+
+    monkeypatch.setattr(NumpyActionStore, "_search", failing_search)
+    response = await client.post("/retrieve_actions", json=request)
+    assert response.status_code == 503
+    batch = await client.post("/retrieve_actions_batch", json=[request])
+    assert batch.status_code == 503
+
+    monkeypatch.setattr(NumpyActionStore, "_search", search)
+    assert len((await client.post("/retrieve_actions", json=request)).json()) == 1
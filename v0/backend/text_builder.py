@@ -0,0 +1,95 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+WORD_PATTERN = re.compile(r"\S+")
+
+
+class TextBuilder:
+    """Builds the text that is embedded / BM25-indexed for actions and queries.
+
+    The same builder is used at index and query time so both sides look alike:
+    the tool description first, then the first user message (the task) and the
+    last `last_n_turns` messages of the allowed roles, cut to `max_tokens`
+    whitespace-separated tokens. mode="json" keeps the legacy
+    `json.dumps(chat_history)` text for collections indexed that way.
+    """
+
+    def __init__(
+        self,
+        mode: str = "compact",
+        roles: Sequence[str] = ("user",),
+        last_n_turns: int = 6,
+        max_tokens: int = 256,
+    ):
+        if mode not in ("compact", "json"):
+            raise ValueError(f"Unknown text mode '{mode}', expected 'compact' or 'json'")
+        self.mode = mode
+        self.roles = tuple(roles)
+        self.last_n_turns = last_n_turns
+        self.max_tokens = max_tokens
+
+    @classmethod
+    def from_env(cls) -> "TextBuilder":
+        return cls(
+            mode=os.getenv("EMBED_TEXT_MODE", "compact"),
+            roles=[
+                role.strip()
+                for role in os.getenv("EMBED_TEXT_ROLES", "user").split(",")
+                if role.strip()
+            ],
+            last_n_turns=int(os.getenv("EMBED_TEXT_LAST_N_TURNS", "6")),
+            max_tokens=int(os.getenv("EMBED_TEXT_MAX_TOKENS", "256")),
+        )
+
+    def build(
+        self, chat_history: List[Dict[str, str]], tool_description: Optional[str] = None
+    ) -> str:
+        if self.mode == "json":
+            return json.dumps(chat_history)
+
+        messages = [
+            message
+            for message in chat_history
+            if message.get("role") in self.roles and message.get("content")
+        ]
+        keep = list(range(max(0, len(messages) - self.last_n_turns), len(messages)))
+        if self.last_n_turns <= 0:
+            keep = []
+        has_task = bool(messages) and messages[0]["role"] == "user"
+        if has_task and 0 not in keep:
+            keep = [0] + keep
+
+        # Spend the token budget by priority: tool description, task, newest turns
+        budget = self.max_tokens
+        header = ""
+        if tool_description:
+            header, budget = self._take(tool_description, budget)
+        pieces: Dict[int, str] = {}
+        for index in sorted(keep, key=lambda i: (not (has_task and i == 0), -i)):
+            if budget <= 0:
+                break
+            pieces[index], budget = self._take(messages[index]["content"], budget)
+
+        lines = [header] if header else []
+        lines.extend(
+            f"{messages[index]['role']}: {pieces[index]}"
+            for index in sorted(pieces)
+            if pieces[index]
+        )
+        if not lines:
+            # Nothing matched the role filter, fall back to the raw history
+            return self._take(json.dumps(chat_history), self.max_tokens)[0]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _take(text: str, budget: int) -> tuple[str, int]:
+        words = WORD_PATTERN.findall(text)
+        return " ".join(words[:budget]), budget - min(len(words), budget)
+
+
+@lru_cache(maxsize=1)
+def default_text_builder() -> TextBuilder:
+    return TextBuilder.from_env()
@@ -1,152 +1,433 @@
 # src/services/weaviate_client.py
 
-import json
-from typing import List, cast
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
-from pydantic import BaseModel
 import weaviate
 from weaviate.classes.config import Configure
-from weaviate.classes.query import MetadataQuery
-from models import ActionData, ActionDataWeaviate, ActionDataWeaviateScored
+from weaviate.classes.data import DataObject
+from weaviate.classes.init import AdditionalConfig
+from weaviate.classes.query import Filter, MetadataQuery
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+from weaviate.config import ConnectionConfig
+from models import (
+    ActionData,
+    ActionDataWeaviate,
+    RetrievalQuery,
+    TenantInfo,
+)
+from dedup import Deduplicator, schema_fingerprint
+from embeddings import Embedder, embedder_from_env
+from hot_tier import HotEntry, HotTier, UsageStats
+from logger import get_logger
+from metrics import STORE_LATENCY
+from store import (
+    DEFAULT_ALPHA,
+    ActionStore,
+    ScoredProperties,
+    StoredAction,
+)
 import os
 
+log = get_logger("weaviate_service")
 
-def action_data_to_weaviate_item(action_data: ActionData) -> ActionDataWeaviate:
-    return ActionDataWeaviate.model_validate(
-        {
-            **action_data.model_dump(),
-            "text_to_embed": json.dumps(action_data.chat_history),
-        }
-    )
+# Named vector holding the embedding of `text_to_embed`
+VECTOR_NAME = "title_vector"
 
 
-def weaviate_item_to_action_data(weaviate_item: ActionDataWeaviate) -> ActionData:
-    return ActionData.model_validate(weaviate_item)
+# Objects sent per gRPC batch call by AsyncWeaviateClient.add_action_data_batch
+BATCH_CHUNK_SIZE = int(os.getenv("WEAVIATE_BATCH_SIZE", "100"))
+# Objects fetched per page by the export cursor
+EXPORT_PAGE_SIZE = int(os.getenv("WEAVIATE_EXPORT_PAGE_SIZE", "200"))
+# Tenants a worker has not touched for this long are set INACTIVE (0 disables)
+TENANT_IDLE_SECONDS = float(os.getenv("WEAVIATE_TENANT_IDLE_SECONDS", "900"))
 
 
-def graded_weaviate_item_to_action_data(
-    weaviate_item: ActionDataWeaviateScored,
-) -> ActionData:
-    return ActionData.model_validate(weaviate_item)
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
 
 
-class WeaviateClient:
-    def __init__(self):
-        print("VOYAGEAI_API_KEY", os.getenv("VOYAGEAI_API_KEY"))
-        headers = {
-            "X-VoyageAI-Api-Key": os.getenv("VOYAGEAI_API_KEY", ""),
-        }
-        if not headers["X-VoyageAI-Api-Key"]:
-            raise ValueError("Please provide a VoyageAI API key")
-        self.client = weaviate.connect_to_local(
-            host=os.getenv("WEAVIATE_HOST", "localhost"),
-            port=int(os.getenv("WEAVIATE_PORT", "8080")),
-            grpc_port=int(os.getenv("WEAVIATE_GRPC_PORT", "50051")),
-            headers=headers,
+def connection_params() -> dict:
+    """Connection settings shared by the sync and async clients"""
+    headers = {}
+    # Only needed by collections created before vectors were computed by the backend
+    if os.getenv("VOYAGEAI_API_KEY"):
+        headers["X-VoyageAI-Api-Key"] = os.getenv("VOYAGEAI_API_KEY", "")
+    return {
+        "host": os.getenv("WEAVIATE_HOST", "localhost"),
+        "port": int(os.getenv("WEAVIATE_PORT", "8080")),
+        "grpc_port": int(os.getenv("WEAVIATE_GRPC_PORT", "50051")),
+        "headers": headers,
+        "additional_config": AdditionalConfig(
+            connection=ConnectionConfig(
+                session_pool_connections=int(
+                    os.getenv("WEAVIATE_POOL_CONNECTIONS", "20")
+                ),
+                session_pool_maxsize=int(os.getenv("WEAVIATE_POOL_MAXSIZE", "100")),
+            ),
+        ),
+    }
+
+
+def create_collection_kwargs(multi_tenancy: bool = False) -> dict:
+    # Vectors are supplied by the backend's Embedder, Weaviate only indexes them
+    kwargs = {
+        "vectorizer_config": [Configure.NamedVectors.none(name=VECTOR_NAME)],
+    }
+    if multi_tenancy:
+        # Tenants are created on first insert and reactivated on first access
+        kwargs["multi_tenancy_config"] = Configure.multi_tenancy(
+            enabled=True, auto_tenant_creation=True, auto_tenant_activation=True
+        )
+    return kwargs
+
+
+class AsyncWeaviateClient(ActionStore):
+    """Weaviate action store used by the FastAPI backend, without blocking its event loop.
+
+    The underlying connection (HTTP session pool + gRPC channel) is opened once
+    with `connect()` in the app lifespan and reused by every request.
+
+    Requests without a tenant use the shared `collection_name` collection.
+    Tenant requests go to `tenant_collection_name`, a multi-tenant collection
+    where every tenant has its own shard and HNSW graph, so a query only scans
+    its tenant's actions and idle tenants can be unloaded from memory.
+    """
+
+    def __init__(
+        self,
+        collection_name: str = "actions",
+        embedder: Optional[Embedder] = None,
+        tenant_collection_name: Optional[str] = None,
+    ):
+        self.embedder = embedder or embedder_from_env()
+        self.deduplicator = Deduplicator.from_env()
+        self.usage = UsageStats.from_env()
+        self.hot_tier = HotTier.from_env()
+        self.client = weaviate.use_async_with_local(**connection_params())
+        self.collection_name = collection_name
+        self.tenant_collection_name = tenant_collection_name or os.getenv(
+            "WEAVIATE_TENANT_COLLECTION", f"{collection_name}_tenants"
         )
-        meta_info = self.client.get_meta()
-        print(meta_info)
+        self._known_collections: set[str] = set()
+        # tenant -> monotonic time of its last use by this worker
+        self._tenant_last_used: Dict[str, float] = {}
+        self._idle_task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        await self.client.connect()
+        meta_info = await self.client.get_meta()
+        log.info("weaviate_connected", version=meta_info.get("version"))
+        if TENANT_IDLE_SECONDS > 0:
+            self._idle_task = asyncio.create_task(self._deactivate_idle_tenants())
+
+    async def close(self) -> None:
+        if self._idle_task is not None:
+            self._idle_task.cancel()
+        await self.client.close()
+        await self.embedder.aclose()
+
+    async def ready(self) -> bool:
+        try:
+            return await self.client.is_ready()
+        except Exception as e:
+            log.warning("weaviate_not_ready", error=str(e))
+            return False
 
-    def ensure_collection(self, collection_name: str) -> None:
-        if self.client.collections.exists(collection_name):
-            print(f"Collection '{collection_name}' already exists")
+    async def ensure_collection(
+        self, collection_name: str, multi_tenancy: bool = False
+    ) -> None:
+        if collection_name in self._known_collections:
+            return
+        if await self.client.collections.exists(collection_name):
+            log.debug("collection_exists", collection=collection_name)
         else:
-            self.client.collections.create(
-                collection_name,
-                vectorizer_config=[
-                    Configure.NamedVectors.text2vec_voyageai(
-                        name="title_vector",
-                        source_properties=["text_to_embed"],
-                        model="voyage-2",
+            await self.client.collections.create(
+                collection_name, **create_collection_kwargs(multi_tenancy)
+            )
+            log.info("collection_created", collection=collection_name)
+        self._known_collections.add(collection_name)
+
+    async def _collection(self, tenant: Optional[str] = None, touch: bool = True):
+        """Shared collection, or the tenant's shard of the multi-tenant collection.
+
+        `touch=False` is for background reads, which must not keep an
+        otherwise idle tenant from being deactivated.
+        """
+        if tenant is None:
+            await self.ensure_collection(self.collection_name)
+            return self.client.collections.get(self.collection_name)
+        await self.ensure_collection(self.tenant_collection_name, multi_tenancy=True)
+        if touch:
+            self._tenant_last_used[tenant] = time.monotonic()
+        return self.client.collections.get(self.tenant_collection_name).with_tenant(
+            tenant
+        )
+
+    async def _deactivate_idle_tenants(self) -> None:
+        """Periodically set tenants idle for TENANT_IDLE_SECONDS to INACTIVE.
+
+        Inactive shards are flushed to disk and dropped from memory; the next
+        read or write reactivates them (auto_tenant_activation).
+        """
+        while True:
+            await asyncio.sleep(min(TENANT_IDLE_SECONDS, 60))
+            now = time.monotonic()
+            idle = [
+                tenant
+                for tenant, last_used in self._tenant_last_used.items()
+                if now - last_used > TENANT_IDLE_SECONDS
+            ]
+            if not idle:
+                continue
+            for tenant in idle:
+                del self._tenant_last_used[tenant]
+            try:
+                await self.client.collections.get(
+                    self.tenant_collection_name
+                ).tenants.update(
+                    [
+                        Tenant(name=tenant, activity_status=TenantActivityStatus.INACTIVE)
+                        for tenant in idle
+                    ]
+                )
+                log.info("tenants_deactivated", tenants=idle)
+            except Exception as e:
+                log.warning("tenant_deactivation_failed", tenants=idle, error=str(e))
+
+    async def _insert_many(
+        self,
+        weaviate_items: List[ActionDataWeaviate],
+        vectors: List[List[float]],
+        tenant: Optional[str] = None,
+        object_ids: Optional[List[Optional[str]]] = None,
+    ) -> Dict[int, str]:
+        """Insert in gRPC batches of BATCH_CHUNK_SIZE; returns {index: error} for failures"""
+        collection = await self._collection(tenant)
+        object_ids = object_ids or [None] * len(weaviate_items)
+        failures: Dict[int, str] = {}
+        for start in range(0, len(weaviate_items), BATCH_CHUNK_SIZE):
+            chunk = list(
+                zip(
+                    weaviate_items[start : start + BATCH_CHUNK_SIZE],
+                    vectors[start : start + BATCH_CHUNK_SIZE],
+                    object_ids[start : start + BATCH_CHUNK_SIZE],
+                )
+            )
+            try:
+                response = await collection.data.insert_many(
+                    [
+                        DataObject(
+                            properties=weaviate_item.model_dump(exclude_none=True),
+                            uuid=object_id,
+                            vector={VECTOR_NAME: vector},
+                        )
+                        for weaviate_item, vector, object_id in chunk
+                    ]
+                )
+            except Exception as e:
+                failures.update({start + i: str(e) for i in range(len(chunk))})
+                continue
+            for index, error in response.errors.items():
+                failures[start + index] = error.message
+        log.info(
+            "actions_added",
+            collection=collection.name,
+            tenant=tenant,
+            inserted=len(weaviate_items) - len(failures),
+            failed=len(failures),
+        )
+        return failures
+
+    async def find_fingerprints(
+        self, fingerprints: List[str], tenant: Optional[str] = None
+    ) -> Dict[str, str]:
+        # One filtered fetch per BATCH_CHUNK_SIZE fingerprints
+        collection = await self._collection(tenant)
+        found: Dict[str, str] = {}
+        try:
+            for start in range(0, len(fingerprints), BATCH_CHUNK_SIZE):
+                remaining = fingerprints[start : start + BATCH_CHUNK_SIZE]
+                while remaining:
+                    response = await collection.query.fetch_objects(
+                        filters=Filter.by_property("fingerprint").contains_any(remaining),
+                        limit=len(remaining),
+                        return_properties=["fingerprint"],
                     )
-                ],
+                    for obj in response.objects:
+                        found.setdefault(obj.properties["fingerprint"], str(obj.uuid))
+                    if len(response.objects) < len(remaining):
+                        break
+                    # A full page may hold several objects per fingerprint; ask again for the rest
+                    remaining = [f for f in remaining if f not in found]
+        except Exception as e:
+            # Collections filled before fingerprints existed have no such property
+            log.warning("fingerprint_lookup_failed", error=str(e))
+        return found
+
+    async def find_near_duplicate(
+        self,
+        weaviate_item: ActionDataWeaviate,
+        vector: List[float],
+        tenant: Optional[str] = None,
+    ) -> Optional[str]:
+        collection = await self._collection(tenant)
+        neighbours = await collection.query.near_vector(
+            near_vector=vector,
+            target_vector=VECTOR_NAME,
+            limit=self.deduplicator.neighbours,
+            distance=1 - self.deduplicator.similarity,
+            return_properties=["input_json_schema", "output_json_schema"],
+        )
+        for obj in neighbours.objects:
+            stored_schema = schema_fingerprint(
+                obj.properties["input_json_schema"], obj.properties["output_json_schema"]
             )
-            print(f"Collection '{collection_name}' created successfully")
-
-    def add_action_data(self, action_data: ActionData) -> None:
-        collection_name = "actions"
-        self.ensure_collection(collection_name)
-        collection = self.client.collections.get(collection_name)
-        weaviate_item = action_data_to_weaviate_item(action_data)
-        collection.data.insert(weaviate_item.model_dump())
-        print(f"Added:{weaviate_item.model_dump_json(indent=4)[:50] + '...'} to collection '{collection_name}'")
-
-    def retrieve_action_data(
-        self, query: str, top_k: int = 10
-    ) -> List[tuple[ActionData, float]]:
-        collection_name = "actions"
-        self.ensure_collection(collection_name)
-        collection = self.client.collections.get(collection_name)
-        try:    
-            response = collection.query.hybrid(
-                query=query,
-                limit=top_k,
+            if stored_schema == weaviate_item.schema_fingerprint:
+                return str(obj.uuid)
+        return None
+
+    async def _search(
+        self, query: RetrievalQuery, vector: List[float]
+    ) -> List[ScoredProperties]:
+        collection = await self._collection(query.tenant)
+        # best_only keeps one of up to top_k candidates: the first pass then only
+        # returns ids and scores, and the survivor alone is fetched in full.
+        # Otherwise the threshold rarely cuts enough to pay for a second round
+        # trip, so properties come with the search and are filtered here.
+        hydrate_later = query.best_only and query.top_k > 1
+        with STORE_LATENCY.time("query"):
+            response = await collection.query.hybrid(
+                query=query.query,
+                vector=vector,
+                target_vector=VECTOR_NAME,
+                alpha=DEFAULT_ALPHA if query.alpha is None else query.alpha,
+                limit=query.top_k,
+                auto_limit=query.auto_limit,
+                max_vector_distance=query.max_vector_distance,
                 include_vector=False,
                 return_metadata=MetadataQuery(score=True),
+                return_properties=[] if hydrate_later else query.return_properties,
+            )
+        objects = [
+            obj
+            for obj in response.objects
+            if obj is not None
+            and (query.threshold is None or obj.metadata.score > query.threshold)
+        ]
+        if query.best_only:
+            objects = objects[:1]
+        if not hydrate_later:
+            return [(str(obj.uuid), obj.properties, obj.metadata.score) for obj in objects]
+        if not objects:
+            return []
+        scored = [(obj.uuid, obj.metadata.score) for obj in objects]
+        with STORE_LATENCY.time("hydrate"):
+            hydrated = await collection.query.fetch_objects(
+                filters=Filter.by_id().contains_any([uuid for uuid, _ in scored]),
+                limit=len(scored),
+                return_properties=query.return_properties,
             )
+        properties = {obj.uuid: obj.properties for obj in hydrated.objects}
+        return [
+            (str(uuid), properties[uuid], score)
+            for uuid, score in scored
+            if uuid in properties
+        ]
+
+    async def fetch_with_vectors(
+        self, action_ids: List[str], tenant: Optional[str] = None
+    ) -> List[HotEntry]:
+        collection = await self._collection(tenant, touch=False)
+        if tenant is not None:
+            # Reading an inactive tenant would reactivate it (auto_tenant_activation)
+            status = await collection.tenants.get_by_name(tenant)
+            if status is None or status.activity_status != TenantActivityStatus.ACTIVE:
+                return []
+        # Usage rows may hold ids Weaviate rejects; one must not fail the whole tenant
+        action_ids = [action_id for action_id in action_ids if _is_uuid(action_id)]
+        if not action_ids:
+            return []
+        response = await collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(action_ids),
+            limit=len(action_ids),
+            include_vector=True,
+        )
+        return [
+            (str(obj.uuid), obj.properties, obj.vector[VECTOR_NAME])
+            for obj in response.objects
+            if VECTOR_NAME in obj.vector
+        ]
+
+    async def existing_ids(
+        self, action_ids: List[str], tenant: Optional[str] = None
+    ) -> Set[str]:
+        collection = await self._collection(tenant)
+        response = await collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(action_ids),
+            limit=len(action_ids),
+            return_properties=[],
+        )
+        # Weaviate returns ids in canonical lowercase form
+        found = {str(obj.uuid) for obj in response.objects}
+        return {action_id for action_id in action_ids if action_id.lower() in found}
+
+    async def iter_actions(
+        self, tenant: Optional[str] = None, include_vector: bool = False
+    ) -> AsyncIterator[StoredAction]:
+        # Cursor over object ids: one fetch per EXPORT_PAGE_SIZE objects, no offset scans
+        collection = await self._collection(tenant)
+        async for obj in collection.iterator(
+            include_vector=include_vector,
+            return_properties=list(ActionData.model_fields),
+            cache_size=EXPORT_PAGE_SIZE,
+        ):
+            vector = obj.vector.get(VECTOR_NAME) if include_vector else None
+            yield str(obj.uuid), obj.properties, vector
+
+    async def get_action_data(
+        self, action_id: str, tenant: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        collection = await self._collection(tenant)
+        try:
+            obj = await collection.query.fetch_object_by_id(action_id)
         except Exception as e:
-            print(f"Error retrieving actions: {e}")
+            # Malformed ids are rejected by Weaviate, treat them as missing
+            log.warning("fetch_action_failed", action_id=action_id, error=str(e))
+            return None
+        return None if obj is None else obj.properties
+
+    async def list_tenants(self) -> List[TenantInfo]:
+        if not await self.client.collections.exists(self.tenant_collection_name):
             return []
-        action_data_tuples = []
-        for obj in response.objects:
-            if obj is None:
-                continue
-            else:
-                action_data_tuples.append(
-                    (
-                        ActionData(**obj.properties),
-                        obj.metadata.score,
-                    )
-                )
-        return action_data_tuples
-
-    # def add_target_clients(
-    #     self, session_id: str, chunk_target_client: List[ChunkTargetClient]
-    # ) -> None:
-    #     collection_name = f"{session_id}_targets"
-    #     self.ensure_collection(collection_name)
-    #     collection = self.client.collections.get(collection_name)
-    #     with collection.batch.dynamic() as batch:
-    #         for profile in chunk_target_client:
-    #             batch.add_object(profile.model_dump())
-    #     if len(collection.batch.failed_objects) > 0:
-    #         print(f"Failed to import {len(collection.batch.failed_objects)} objects")
-    #         for failed in collection.batch.failed_objects:
-    #             print(f"Failed to import object with error: {failed.message}")
-    #     print(
-    #         f"Added {len(chunk_target_client) - len(collection.batch.failed_objects)} objects to collection '{collection_name}'"
-    #     )
-
-    # def retrieve_target_clients(
-    #     self, session_id: str, query: str
-    # ) -> List[GradedTargetClient]:
-    #     collection_name = f"{session_id}_targets"
-    #     if not self.client.collections.exists(collection_name):
-    #         raise ValueError(f"Collection '{collection_name}' does not exist")
-    #     collection = self.client.collections.get(collection_name)
-    #     response = collection.query.hybrid(
-    #         query=query,
-    #         limit=100,
-    #         include_vector=False,
-    #         return_metadata=MetadataQuery(score=True),
-    #     )
-    #     graded_target_client_objects = []
-    #     for obj in response.objects:
-    #         if obj is None:
-    #             continue
-    #         else:
-    #             graded_target_client = {
-    #                 "chunk": obj.properties,
-    #                 "grade": obj.metadata.score,
-    #             }
-    #             graded_target_client_objects.append(
-    #                 GradedTargetClient(**graded_target_client)
-    #             )
-
-    #     return graded_target_client_objects
-
-    def delete_collection(self, collection_name: str) -> None:
-        if not self.client.collections.exists(collection_name):
+        collection = self.client.collections.get(self.tenant_collection_name)
+        tenants = sorted((await collection.tenants.get()).values(), key=lambda t: t.name)
+
+        async def count(tenant: Tenant) -> Optional[int]:
+            # Counting an inactive tenant would load it back into memory
+            if tenant.activity_status != TenantActivityStatus.ACTIVE:
+                return None
+            return await collection.with_tenant(tenant.name).length()
+
+        counts = await asyncio.gather(*(count(tenant) for tenant in tenants))
+        return [
+            TenantInfo(
+                name=tenant.name,
+                status=tenant.activity_status.value.lower(),
+                objects=objects,
+            )
+            for tenant, objects in zip(tenants, counts)
+        ]
+
+    async def delete_collection(self, collection_name: str) -> None:
+        if not await self.client.collections.exists(collection_name):
             raise ValueError(f"Collection '{collection_name}' does not exist")
-        self.client.collections.delete(collection_name)
-        print(f"Collection '{collection_name}' deleted successfully")
+        await self.client.collections.delete(collection_name)
+        self._known_collections.discard(collection_name)
+        log.info("collection_deleted", collection=collection_name)
@@ -0,0 +1,93 @@
+"""Compiled actions, cached by the hash of their code.
+
+Executing an action used to `exec` its source on every call, parsing and
+compiling it again each time the same action was reused. The cache compiles
+each distinct source once and keeps its module namespace and `action`
+callable, so reuse costs a dictionary lookup.
+
+Module-level state an action keeps in its globals persists between cached
+executions, as it would for an imported module; `invalidate` drops it.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import CodeType
+from typing import Any, Callable, Dict, Optional
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CompiledAction:
+    code_object: CodeType
+    namespace: Dict[str, Any]
+    action: Callable[..., Any]
+
+
+class CompiledActionCache:
+    """LRU of at most `max_size` compiled actions, keyed by code hash.
+
+    Code that fails to compile or run, or defines no `action`, raises and is
+    not cached. `max_size=0` disables caching.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._actions: "OrderedDict[str, CompiledAction]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "CompiledActionCache":
+        return cls(max_size=int(os.getenv("ACTION_CACHE_SIZE", "256")))
+
+    def _compile(self, code: str, key: str) -> CompiledAction:
+        # The hash in the filename ties tracebacks to the action's source
+        code_object = compile(code, f"<action {key[:12]}>", "exec")
+        namespace: Dict[str, Any] = {}
+        exec(code_object, namespace)
+        return CompiledAction(code_object, namespace, namespace["action"])
+
+    def get(self, code: str) -> CompiledAction:
+        key = code_hash(code)
+        compiled = self._actions.get(key)
+        if compiled is not None:
+            self._actions.move_to_end(key)
+            self.hits += 1
+            return compiled
+        self.misses += 1
+        compiled = self._compile(code, key)
+        if self.max_size:
+            self._actions[key] = compiled
+            if len(self._actions) > self.max_size:
+                self._actions.popitem(last=False)
+                self.evictions += 1
+        return compiled
+
+    def invalidate(self, code: Optional[str] = None) -> None:
+        """Drop the compiled action for `code`, or every action when it is None"""
+        if code is None:
+            self._actions.clear()
+        else:
+            self._actions.pop(code_hash(code), None)
+
+    def __len__(self) -> int:
+        return len(self._actions)
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "size": len(self._actions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Shared by every ActionClient in the process
+compiled_actions = CompiledActionCache.from_env()
@@ -1,10 +1,13 @@
 from typing import Optional, List, Dict, Any
+import httpx
 from .services.llm import LLMService
 from .services.backend import BackendService
 from .models.actions import ActionData, ActionExecutionPayload
 from .models.requests import ActionCollectiveRequest
+from .strict_schema import validate_strict_schema
+from .action_cache import CompiledActionCache, compiled_actions
+from .sandbox import SandboxPool, shared_sandbox_pool
 import os
-from openai._exceptions import LengthFinishReasonError
 import json
 
 
@@ -14,9 +17,20 @@ class ActionClient:
         openai_api_key: Optional[str] = None,
         backend_url: Optional[str] = None,
         verbose: bool = False,
+        tenant: Optional[str] = None,
+        action_cache: Optional[CompiledActionCache] = None,
+        sandbox: Optional[SandboxPool] = None,
     ):
         self.llm = LLMService(openai_api_key or os.getenv("OPENAI_API_KEY"))
-        self.backend = BackendService(backend_url or os.getenv("BACKEND_URL"))
+        self.backend = BackendService(
+            backend_url or os.getenv("BACKEND_URL"),
+            tenant=tenant or os.getenv("ACTION_TENANT"),
+        )
+        # Compiled actions, shared by every client in the process unless given
+        self.action_cache = compiled_actions if action_cache is None else action_cache
+        # Generated code runs in these worker processes; by default the pool
+        # shared on the event loop, or in this process if SANDBOX_ENABLED=false
+        self.sandbox = sandbox
         self.chat_history: List[Dict[str, str]] = []
 
         # Run state params
@@ -28,30 +42,28 @@ class ActionClient:
         self.action_execution_payload: Optional[ActionExecutionPayload] = None
 
     async def validate_schema(self, schema: dict) -> None:
-        """Validate the schema using OpenAI's parse endpoint"""
+        """Validate the schema against the strict structured-output rules, locally"""
         try:
-            if not schema.get("description"):
-                raise Exception("Description is required for all properties")
-
-            self.llm.client.beta.chat.completions.parse(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": "a"}],
-                max_completion_tokens=1,  # Minimum cost
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "action_items",
-                        "description": "The action items to be completed",
-                        "strict": True,
-                        "schema": schema,
-                    },
-                },
-            )
-        except LengthFinishReasonError as e:
-            pass
+            validate_strict_schema(schema)
         except Exception as e:
             raise Exception(f"Failed to validate schema: {e}")
 
+    async def run_test(self, code: str, test: str) -> None:
+        """Run the action's test, raising if it fails"""
+        sandbox = self.sandbox or shared_sandbox_pool()
+        if sandbox is None:
+            exec(code + "\n" + test, {})
+        else:
+            await sandbox.run_test(code, test)
+
+    async def run_action(self, code: str, params: Dict[str, Any]) -> Any:
+        """Call the `action` defined by `code` with `params`"""
+        sandbox = self.sandbox or shared_sandbox_pool()
+        if sandbox is None:
+            # Compiled once per distinct code, then reused from the cache
+            return self.action_cache.get(code).action(**params)
+        return await sandbox.execute(code, params)
+
     async def retrieve_or_generate(
         self,
         action_data: Optional[ActionData] = None,
@@ -93,7 +105,11 @@ class ActionClient:
         actions = await self.backend.retrieve_actions(
             self.chat_history + self.internal_chat_history,
             top_k=retrieve_top_k,
-            threshold=retrieve_threshold
+            threshold=retrieve_threshold,
+            best_only=True,  # Only the best match is ever used
+            tool_description=action_thought.tool_description,
+            # The stored chat history is never used once an action is retrieved
+            fields=["input_json_schema", "output_json_schema", "code", "test"],
         )
 
         if self.verbose:
@@ -150,11 +166,13 @@ class ActionClient:
                     await self.validate_schema(loaded_schema)
 
                     print("\n\nexecuting:\n\n", complete_test)
-                    exec(complete_test, {})
+                    await self.run_test(action_generator.code, action_generator.test)
                     print("\n\nPASSED")
 
                     action = ActionData(
-                        **action_generator.model_dump(), chat_history=self.chat_history
+                        **action_generator.model_dump(),
+                        chat_history=self.chat_history,
+                        tool_description=action_thought.tool_description,
                     )
                     await self.backend.submit_action(action)
                     break
@@ -192,27 +210,13 @@ Make sure to maintain a simple JSON Schema as in the example.""",
         if self.verbose:
             print("\n\nChat History Pre Params:\n", self.chat_history)
 
-        action_params = self.llm.client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
-            messages=(self.chat_history + self.internal_chat_history)[
+        params = await self.llm.get_action_params(
+            (self.chat_history + self.internal_chat_history)[
                 :-1
             ],  # Exclude the last assistant message
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "action_items",
-                    "description": "The action items to be completed",
-                    "strict": True,
-                    "schema": json.loads(action_data.input_json_schema),
-                },
-            },
+            action_data.input_json_schema,
         )
 
-        if not action_params.choices[0].message.content:
-            raise Exception("Failed to get action params")
-
-        params = json.loads(action_params.choices[0].message.content)
-
         if self.verbose:
             print("\n\nparams:\n", params)
 
@@ -233,14 +237,20 @@ Make sure to maintain a simple JSON Schema as in the example.""",
         action_data = action_execution_payload.action_data
         params = action_execution_payload.params
 
-        # Create a namespace for execution
-        namespace = {}
-
-        # Execute the action code to define the function in our namespace
-        exec(action_data.code, namespace)
-
-        # Execute the action function with unpacked parameters
-        result = namespace["action"](**params)
+        success = False
+        try:
+            # Execute the action function with unpacked parameters
+            result = await self.run_action(action_data.code, params)
+            success = True
+        finally:
+            # Usage statistics keep frequently executed actions in the backend's hot tier
+            if action_data.id:
+                try:
+                    await self.backend.report_execution(action_data.id, success)
+                except httpx.HTTPError as e:
+                    # Statistics are best effort and must not fail the action
+                    if self.verbose:
+                        print(f"\n\nreport_execution failed: {e}\n\n")
 
         self.internal_chat_history.append(
             {"role": "assistant", "content": f"RESULT FROM ACTION: {result}"}
@@ -256,12 +266,9 @@ Make sure to maintain a simple JSON Schema as in the example.""",
             {"role": "assistant", "content": "Now I will summarize the result..."}
         )
 
-        summary_response = self.llm.client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
-            messages=self.chat_history + self.internal_chat_history,
+        summary = await self.llm.summarize(
+            self.chat_history + self.internal_chat_history
         )
-
-        summary = summary_response.choices[0].message.content
         self.internal_chat_history.append({"role": "assistant", "content": summary})
 
         self.summary = summary
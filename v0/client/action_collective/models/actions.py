@@ -1,13 +1,15 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 class ActionData(BaseModel):
+    id: Optional[str] = None  # Set on actions retrieved from the backend
     input_json_schema: str
     output_json_schema: str
     code: str
     test: str
-    chat_history: List[Dict[str, str]]
+    chat_history: List[Dict[str, str]] = []
+    tool_description: Optional[str] = None
 
 
 class ActionExecutionPayload(BaseModel):
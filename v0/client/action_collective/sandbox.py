@@ -0,0 +1,341 @@
+"""Generated code runs in a pool of warm worker processes, not in the client.
+
+Workers are forked from a multiprocessing forkserver that has already
+imported the commonly used modules (SANDBOX_PRELOAD), so a new worker starts
+warm in milliseconds. Where there is no forkserver (Windows) workers are
+spawned and import those modules themselves before taking work. Each worker
+runs one call at a time under memory, CPU and core-dump rlimits and keeps its
+own CompiledActionCache. The client awaits the result without blocking its
+event loop. A call that exceeds its
+timeout, is cancelled, or kills its worker gets that worker replaced; the
+other workers keep serving.
+
+Results are awaited with `loop.add_reader`, or by polling the pipe in a
+thread on event loops without it (the Windows Proactor loop). rlimits need
+the `resource` module and are skipped where it is missing; the timeout still
+applies.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import traceback
+import weakref
+from importlib import import_module
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from .action_cache import CompiledActionCache
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class SandboxError(Exception):
+    """The sandbox could not run the call to completion"""
+
+
+class SandboxTimeout(SandboxError):
+    """The call exceeded its wall-clock timeout and its worker was killed"""
+
+
+class SandboxCrashed(SandboxError):
+    """The worker died during the call, e.g. on its CPU limit or a segfault"""
+
+
+class _RemoteTraceback(Exception):
+    # Attached as __cause__ of exceptions raised by actions, as concurrent.futures does
+    def __init__(self, tb: str):
+        self.tb = tb
+
+    def __str__(self) -> str:
+        return self.tb
+
+
+def _set_limits(memory_mb: int) -> None:
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _limit_cpu(cpu_seconds: int) -> None:
+    """The CPU limit is cumulative per process, so move it forward for each call"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _run(request: Tuple[str, str, Any], cache: CompiledActionCache) -> Any:
+    kind, code, arg = request
+    if kind == "test":
+        exec(compile(code + "\n" + arg, "<action test>", "exec"), {})
+        return None
+    return cache.get(code).action(**arg)
+
+
+def _worker_main(
+    conn: Connection,
+    memory_mb: int,
+    cpu_seconds: int,
+    cache_size: int,
+    preload: Sequence[str] = (),
+) -> None:
+    # Ctrl-C is the parent's to handle; it kills workers on close
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Only set for spawned workers; forkserver workers inherit the imports
+    for module in preload:
+        try:
+            import_module(module)
+        except ImportError:
+            pass
+    if resource is not None:
+        _set_limits(memory_mb)
+    cache = CompiledActionCache(max_size=cache_size)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if resource is not None and cpu_seconds:
+            _limit_cpu(cpu_seconds)
+        try:
+            reply = ("ok", _run(request, cache), None)
+        except BaseException as e:
+            reply = ("error", e, traceback.format_exc())
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Results and exceptions must pickle to leave the worker
+            what = "result" if reply[0] == "ok" else "exception"
+            conn.send(("error", SandboxError(f"the action's {what} cannot be pickled: {e}"), reply[2]))
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.Process, conn: Connection):
+        self.process = process
+        self.conn = conn
+
+    def kill(self) -> None:
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+
+
+async def _readable(conn: Connection, timeout: float) -> bool:
+    """Whether a reply arrived on `conn` within `timeout` seconds"""
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    fd = conn.fileno()
+    try:
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+    except NotImplementedError:
+        # The Proactor loop has no add_reader: poll the pipe from a thread
+        return await loop.run_in_executor(None, conn.poll, timeout)
+    try:
+        await asyncio.wait_for(ready, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(fd)
+
+
+class SandboxPool:
+    """`size` worker processes running action tests and executions in parallel.
+
+    Calls wait for an idle worker, then run with a wall-clock `timeout`;
+    each worker is capped at `memory_mb` of address space and `cpu_seconds`
+    of CPU time per call (0 disables either limit). Exceptions raised by the
+    action are re-raised in the caller with the worker's traceback as cause.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        timeout: float = 30.0,
+        memory_mb: int = 1024,
+        cpu_seconds: int = 30,
+        preload: Sequence[str] = ("numpy", "requests"),
+        cache_size: int = 256,
+        start_method: Optional[str] = None,
+    ):
+        self.size = size or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.cache_size = cache_size
+        if start_method is None:
+            available = multiprocessing.get_all_start_methods()
+            start_method = "forkserver" if "forkserver" in available else "spawn"
+        self._context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            # Imported once by the fork server, so every worker starts with them.
+            # With __main__ among them workers also skip re-running the main script.
+            self._context.set_forkserver_preload(["__main__", __name__, *preload])
+            self._worker_preload: Sequence[str] = ()
+        else:
+            self._worker_preload = tuple(preload)
+        self._workers: Set[_Worker] = set()
+        self._idle: "Optional[asyncio.Queue[_Worker]]" = None
+        self._start_lock = asyncio.Lock()
+        self._closed = False
+        self.calls = 0
+        self.timeouts = 0
+        self.crashes = 0
+
+    @classmethod
+    def from_env(cls) -> "SandboxPool":
+        return cls(
+            size=int(os.getenv("SANDBOX_WORKERS", "0")) or None,
+            timeout=float(os.getenv("SANDBOX_TIMEOUT", "30")),
+            memory_mb=int(os.getenv("SANDBOX_MEMORY_MB", "1024")),
+            cpu_seconds=int(os.getenv("SANDBOX_CPU_SECONDS", "30")),
+            preload=[m for m in os.getenv("SANDBOX_PRELOAD", "numpy,requests").split(",") if m],
+            cache_size=int(os.getenv("ACTION_CACHE_SIZE", "256")),
+        )
+
+    def _spawn(self) -> _Worker:
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                child_conn,
+                self.memory_mb,
+                self.cpu_seconds,
+                self.cache_size,
+                self._worker_preload,
+            ),
+            daemon=True,
+        )
+        process.start()
+        # Only the worker holds its end, so its death reads as EOF here
+        child_conn.close()
+        worker = _Worker(process, conn)
+        self._workers.add(worker)
+        return worker
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        self._workers.discard(worker)
+        worker.kill()
+        return self._spawn()
+
+    async def start(self) -> None:
+        """Start the workers; called by the first call if not done earlier"""
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            if self._closed:
+                raise SandboxError("the sandbox pool is closed")
+            loop = asyncio.get_running_loop()
+            # The first start also boots the fork server and its imports
+            workers: List[_Worker] = await loop.run_in_executor(
+                None, lambda: [self._spawn() for _ in range(self.size)]
+            )
+            self._idle = asyncio.Queue()
+            for worker in workers:
+                self._idle.put_nowait(worker)
+
+    async def _call(self, request: Tuple[str, str, Any], timeout: Optional[float]) -> Any:
+        if self._idle is None:
+            await self.start()
+        if self._closed:
+            raise SandboxError("the sandbox pool is closed")
+        timeout = timeout or self.timeout
+        worker = await self._idle.get()
+        self.calls += 1
+        healthy = False
+        try:
+            try:
+                worker.conn.send(request)
+                arrived = await _readable(worker.conn, timeout)
+                reply = worker.conn.recv() if arrived else None
+            except (EOFError, OSError):
+                self.crashes += 1
+                await asyncio.get_running_loop().run_in_executor(None, worker.process.join, 1)
+                raise SandboxCrashed(
+                    f"sandbox worker exited with code {worker.process.exitcode}"
+                ) from None
+            except Exception as e:
+                # Pickling fails before anything is written, so the worker is fine
+                healthy = True
+                raise SandboxError(f"the call or its reply cannot be pickled: {e}") from e
+            if not arrived:
+                self.timeouts += 1
+                raise SandboxTimeout(f"action did not finish within {timeout}s")
+            healthy = True
+        finally:
+            if self._closed:
+                worker.kill()
+            else:
+                # A worker that timed out, crashed or was cancelled mid-call is in an unknown state
+                self._idle.put_nowait(worker if healthy else self._replace(worker))
+        status, value, tb = reply
+        if status == "error":
+            value.__cause__ = _RemoteTraceback(tb)
+            raise value
+        return value
+
+    async def run_test(self, code: str, test: str, timeout: Optional[float] = None) -> None:
+        """Run `test` against `code` in a fresh namespace; raises if the test fails"""
+        await self._call(("test", code, test), timeout)
+
+    async def execute(
+        self, code: str, params: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Any:
+        """`action(**params)` as defined by `code`; the result must be picklable"""
+        return await self._call(("execute", code, params), timeout)
+
+    async def close(self) -> None:
+        self._closed = True
+        for worker in list(self._workers):
+            worker.kill()
+        self._workers.clear()
+
+    async def __aenter__(self) -> "SandboxPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+        }
+
+
+# One pool per event loop, shared by every ActionClient on it
+_shared_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SandboxPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def shared_sandbox_pool() -> Optional[SandboxPool]:
+    """The running loop's pool, or None when SANDBOX_ENABLED=false"""
+    if os.getenv("SANDBOX_ENABLED", "true").lower() != "true":
+        return None
+    loop = asyncio.get_running_loop()
+    pool = _shared_pools.get(loop)
+    if pool is None:
+        pool = _shared_pools[loop] = SandboxPool.from_env()
+    return pool
+
+
+async def close_shared_sandbox_pool() -> None:
+    """Stop the running loop's shared workers, e.g. before the loop shuts down"""
+    pool = _shared_pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
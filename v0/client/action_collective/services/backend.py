@@ -1,26 +1,147 @@
-import requests
+import asyncio
+import os
+import random
+import weakref
 from typing import List, Optional
+
+import httpx
+
 from ..models.actions import ActionData
 
+# Responses worth retrying: the backend shed load (429) or a proxy in front of it failed
+RETRY_STATUSES = {429, 502, 503, 504}
+# Failures where the request never reached the backend, safe to retry for any call
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# One pooled client per event loop, shared by every BackendService on that loop
+_shared_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Keep-alive client configured from BACKEND_HTTP_* environment variables.
+
+    BACKEND_HTTP2=true needs the `h2` package (`pip install action-collective[http2]`).
+    """
+    # httpcore's pool bookkeeping grows with the square of its connection count,
+    # so a few busy keep-alive connections beat many mostly idle ones
+    max_connections = int(os.getenv("BACKEND_HTTP_MAX_CONNECTIONS", "16"))
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        timeout=httpx.Timeout(
+            float(os.getenv("BACKEND_HTTP_TIMEOUT", "30")),
+            connect=float(os.getenv("BACKEND_HTTP_CONNECT_TIMEOUT", "5")),
+        ),
+        http2=os.getenv("BACKEND_HTTP2", "false").lower() == "true",
+    )
+
+
+def shared_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _shared_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _shared_clients[loop] = create_http_client()
+    return client
+
+
+async def close_shared_http_client() -> None:
+    """Close the running loop's shared client, e.g. before the loop shuts down"""
+    client = _shared_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
 class BackendService:
-    def __init__(self, backend_url: str):
-        self.backend_url = backend_url
-    
+    """Async client of the Action Collective backend.
+
+    Requests go through `http_client`, by default a keep-alive pool shared by
+    every BackendService on the event loop, so concurrent ActionClients reuse
+    connections and never block the loop. Failed calls are retried up to
+    `retries` times with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        backend_url: str,
+        tenant: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        retries: Optional[int] = None,
+        backoff: float = 0.2,
+        max_backoff: float = 5.0,
+    ):
+        self.backend_url = backend_url.rstrip("/")
+        # Actions are stored and searched in this tenant's partition only
+        self.params = {"tenant": tenant} if tenant else {}
+        self.http_client = http_client
+        self.retries = (
+            int(os.getenv("BACKEND_HTTP_RETRIES", "3")) if retries is None else retries
+        )
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        # Full jitter, so clients rejected together do not retry together
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay += float(retry_after)
+        return delay
+
+    async def _post(self, path: str, payload: dict, idempotent: bool = True) -> httpx.Response:
+        """POST with retries; non-idempotent calls are only retried if the backend did no work"""
+        client = self.http_client or shared_http_client()
+        retryable_errors = httpx.TransportError if idempotent else UNSENT_ERRORS
+        retryable_statuses = RETRY_STATUSES if idempotent else {429}
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = await client.post(
+                    f"{self.backend_url}{path}", params=self.params, json=payload
+                )
+            except retryable_errors:
+                if attempt >= self.retries:
+                    raise
+            else:
+                if response.status_code not in retryable_statuses or attempt >= self.retries:
+                    response.raise_for_status()
+                    return response
+            await asyncio.sleep(self._delay(attempt, response))
+            attempt += 1
+
     async def submit_action(self, action: ActionData) -> bool:
-        response = requests.post(
-            f"{self.backend_url}/submit_action",
-            json=action.model_dump()
+        # Resubmitting is harmless: the backend skips duplicates of stored actions
+        response = await self._post("/submit_action", action.model_dump())
+        return response.json()
+
+    async def report_execution(self, action_id: str, success: bool) -> bool:
+        response = await self._post(
+            f"/actions/{action_id}/executions", {"success": success}, idempotent=False
         )
         return response.json()
-    
+
     async def retrieve_actions(
-        self, 
-        chat_history: List[dict], 
-        top_k: int = 5, 
-        threshold: float = 0.7
+        self,
+        chat_history: List[dict],
+        top_k: int = 5,
+        threshold: float = 0.7,
+        best_only: bool = False,
+        tool_description: Optional[str] = None,
+        fields: Optional[List[str]] = None
     ) -> List[ActionData]:
-        response = requests.post(
-            f"{self.backend_url}/retrieve_actions",
-            json={"chat_history": chat_history, "top_k": top_k, "threshold": threshold}
+        response = await self._post(
+            "/retrieve_actions",
+            {
+                "chat_history": chat_history,
+                "top_k": top_k,
+                "threshold": threshold,
+                "best_only": best_only,
+                "tool_description": tool_description,
+                "fields": fields,
+            },
         )
-        return [ActionData.model_validate(action) for action in response.json()]
\ No newline at end of file
+        return [ActionData.model_validate(action) for action in response.json()]
@@ -1,24 +1,138 @@
-from typing import Any, Dict, List
+import asyncio
+import json
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
 import openai
+
 from ..models.requests import ActionCollectiveRequest, ActionDataGenerator
 from ..models.actions import ActionData
 
+
+class RateLimiter:
+    """At most `max_concurrency` LLM calls in flight, started at most `rate` per second.
+
+    Starts are paced by a token bucket holding up to `burst` tokens; `rate=0`
+    only bounds concurrency.
+    """
+
+    def __init__(self, max_concurrency: int, rate: float = 0.0, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        burst = os.getenv("LLM_BURST")
+        return cls(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+            rate=float(os.getenv("LLM_REQUESTS_PER_SECOND", "0")),
+            burst=int(burst) if burst else None,
+        )
+
+    async def _take_token(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @asynccontextmanager
+    async def limit(self) -> AsyncIterator[None]:
+        async with self._semaphore:
+            if self.rate > 0:
+                await self._take_token()
+            yield
+
+
+# One limiter per event loop, shared by every LLMService (and so every session) on it
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RateLimiter]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def shared_rate_limiter() -> RateLimiter:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = RateLimiter.from_env()
+    return limiter
+
+
 class LLMService:
-    def __init__(self, api_key: str):
-        self.client = openai.OpenAI(api_key=api_key)
-    
+    """Every OpenAI call made by ActionClient, on the async client.
+
+    Calls are throttled by a RateLimiter (by default the one shared by the
+    event loop) and each has a timeout, so one process can run many sessions
+    concurrently without blocking its loop or tripping the API's rate limits.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o-mini",
+        timeout: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.model = model
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "60"))
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            timeout=self.timeout,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        )
+        self.rate_limiter = rate_limiter
+
+    async def _parse(self, timeout: Optional[float] = None, **kwargs: Any):
+        async with (self.rate_limiter or shared_rate_limiter()).limit():
+            return await self.client.beta.chat.completions.parse(
+                model=self.model, timeout=timeout or self.timeout, **kwargs
+            )
+
     async def get_action_thought(self, chat_history: List[Dict[str, str]]) -> ActionCollectiveRequest:
-        completion = self.client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
+        completion = await self._parse(
             messages=chat_history,
             response_format=ActionCollectiveRequest
         )
         return completion.choices[0].message.parsed
-    
+
     async def generate_action(self, chat_history: List[Dict[str, str]]) -> ActionDataGenerator:
-        response = self.client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
+        response = await self._parse(
             messages=chat_history,
             response_format=ActionDataGenerator
         )
-        return response.choices[0].message.parsed
\ No newline at end of file
+        return response.choices[0].message.parsed
+
+    async def get_action_params(
+        self, chat_history: List[Dict[str, str]], input_json_schema: str
+    ) -> Dict[str, Any]:
+        """Arguments for an action, extracted from the chat under its input schema"""
+        response = await self._parse(
+            messages=chat_history,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "action_items",
+                    "description": "The action items to be completed",
+                    "strict": True,
+                    "schema": json.loads(input_json_schema),
+                },
+            },
+        )
+        if not response.choices[0].message.content:
+            raise Exception("Failed to get action params")
+        return json.loads(response.choices[0].message.content)
+
+    async def summarize(self, chat_history: List[Dict[str, str]]) -> Optional[str]:
+        response = await self._parse(messages=chat_history)
+        return response.choices[0].message.content
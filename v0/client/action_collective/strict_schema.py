@@ -0,0 +1,178 @@
+"""Local check that a JSON Schema is usable by OpenAI structured outputs in strict mode.
+
+Replaces a one-token `chat.completions.parse` round-trip per generated
+action. The rules follow OpenAI's supported-schema documentation, plus this
+project's own requirement that the root and every property carry a
+description. Results are memoized by the schema's hash.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+SUPPORTED_TYPES = {"string", "number", "integer", "boolean", "object", "array", "null"}
+
+# Keywords strict mode rejects, by the type they constrain
+UNSUPPORTED_KEYWORDS = {
+    "string": {"minLength", "maxLength", "pattern", "format"},
+    "number": {"minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf"},
+    "integer": {"minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf"},
+    "object": {
+        "patternProperties", "unevaluatedProperties", "propertyNames",
+        "minProperties", "maxProperties", "dependentRequired", "dependentSchemas",
+    },
+    "array": {
+        "unevaluatedItems", "contains", "minContains", "maxContains",
+        "minItems", "maxItems", "uniqueItems", "prefixItems",
+    },
+}
+UNSUPPORTED_COMPOSITION = {"allOf", "oneOf", "not", "if", "then", "else"}
+
+MAX_PROPERTIES = 100
+MAX_NESTING = 5
+MAX_ENUM_VALUES = 500
+# Property names, definition names, enum and const values, summed
+MAX_STRING_LENGTH = 15_000
+
+MAX_CACHED_SCHEMAS = 1024
+_results: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+
+
+class StrictSchemaError(Exception):
+    """The schema would be rejected by strict structured outputs"""
+
+
+class _Checker:
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self.problems: List[str] = []
+        self.properties = 0
+        self.enum_values = 0
+        self.string_length = 0
+
+    def problem(self, path: str, message: str) -> None:
+        self.problems.append(f"{path or '<root>'}: {message}")
+
+    def resolve(self, path: str, ref: str) -> None:
+        """Only references into the schema itself are supported ("#" recurses)"""
+        if ref == "#":
+            return
+        node: Any = self.root if ref.startswith("#/") else None
+        for part in ref[2:].split("/"):
+            if not isinstance(node, dict) or part not in node:
+                self.problem(path, f"$ref '{ref}' does not resolve to a local definition")
+                return
+            node = node[part]
+
+    def check(self, schema: Any, path: str, depth: int) -> None:
+        if not isinstance(schema, dict):
+            self.problem(path, "schema must be an object")
+            return
+        if "$ref" in schema:
+            self.resolve(path, schema["$ref"])
+            return
+        for keyword in UNSUPPORTED_COMPOSITION & schema.keys():
+            self.problem(path, f"'{keyword}' is not supported")
+        if "anyOf" in schema:
+            if not path:
+                self.problem(path, "the root must be an object, not anyOf")
+            for index, variant in enumerate(schema["anyOf"]):
+                self.check(variant, f"{path}.anyOf[{index}]", depth)
+            return
+
+        if isinstance(schema.get("enum"), list):
+            self.enum_values += len(schema["enum"])
+            self.string_length += sum(
+                len(value) for value in schema["enum"] if isinstance(value, str)
+            )
+        if isinstance(schema.get("const"), str):
+            self.string_length += len(schema["const"])
+
+        types = schema.get("type")
+        if types is None:
+            if "enum" not in schema and "const" not in schema:
+                self.problem(path, "missing 'type'")
+            return
+        types = [types] if isinstance(types, str) else types
+        for name in types:
+            if name not in SUPPORTED_TYPES:
+                self.problem(path, f"type '{name}' is not supported")
+                continue
+            for keyword in UNSUPPORTED_KEYWORDS.get(name, set()) & schema.keys():
+                self.problem(path, f"'{keyword}' is not supported for {name}")
+        if "object" in types:
+            self.check_object(schema, path, depth + 1)
+        if "array" in types:
+            if "items" not in schema:
+                self.problem(path, "arrays must define 'items'")
+            else:
+                self.check(schema["items"], f"{path}[]", depth)
+
+    def check_object(self, schema: Dict[str, Any], path: str, depth: int) -> None:
+        if depth > MAX_NESTING:
+            self.problem(path, f"objects are nested more than {MAX_NESTING} levels deep")
+        if schema.get("additionalProperties") is not False:
+            self.problem(path, "'additionalProperties' must be false")
+        properties = schema.get("properties", {})
+        if not isinstance(properties, dict):
+            self.problem(path, "'properties' must be an object")
+            return
+        missing = [name for name in properties if name not in schema.get("required", [])]
+        if missing:
+            self.problem(path, f"'required' must list every property, missing {missing}")
+        unknown = [name for name in schema.get("required", []) if name not in properties]
+        if unknown:
+            self.problem(path, f"'required' names undefined properties {unknown}")
+        self.properties += len(properties)
+        for name, property_schema in properties.items():
+            self.string_length += len(name)
+            property_path = f"{path}.{name}" if path else name
+            if isinstance(property_schema, dict) and not (
+                property_schema.get("description") or "$ref" in property_schema
+            ):
+                self.problem(property_path, "missing 'description'")
+            self.check(property_schema, property_path, depth)
+
+    def run(self) -> List[str]:
+        if not isinstance(self.root, dict):
+            return ["<root>: schema must be an object"]
+        if self.root.get("type") != "object":
+            self.problem("", "the root must have type 'object'")
+        if not self.root.get("description"):
+            self.problem("", "missing 'description'")
+        for key in ("$defs", "definitions"):
+            for name, definition in self.root.get(key, {}).items():
+                self.string_length += len(name)
+                self.check(definition, f"{key}.{name}", 0)
+        self.check(self.root, "", 0)
+        if self.properties > MAX_PROPERTIES:
+            self.problems.append(f"more than {MAX_PROPERTIES} object properties in total")
+        if self.enum_values > MAX_ENUM_VALUES:
+            self.problems.append(f"more than {MAX_ENUM_VALUES} enum values in total")
+        if self.string_length > MAX_STRING_LENGTH:
+            self.problems.append(
+                f"names and enum values exceed {MAX_STRING_LENGTH} characters in total"
+            )
+        return self.problems
+
+
+def strict_schema_problems(schema: Dict[str, Any]) -> Tuple[str, ...]:
+    """Every strict-mode violation in `schema`, empty when it is valid"""
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    problems = _results.get(digest)
+    if problems is not None:
+        _results.move_to_end(digest)
+        return problems
+    problems = tuple(_Checker(schema).run())
+    _results[digest] = problems
+    if len(_results) > MAX_CACHED_SCHEMAS:
+        _results.popitem(last=False)
+    return problems
+
+
+def validate_strict_schema(schema: Dict[str, Any]) -> None:
+    problems = strict_schema_problems(schema)
+    if problems:
+        raise StrictSchemaError("; ".join(problems))
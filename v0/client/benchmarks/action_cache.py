@@ -0,0 +1,99 @@
+"""Per-execution overhead of turning an action's code into its callable.
+
+Measured for every action in populate/action_datas.json, excluding the call
+of `action` itself:
+
+`uncached`: the previous behaviour, `exec(code, namespace)` on every
+execution, which parses and compiles the source each time.
+
+`miss`: the first execution through CompiledActionCache, compiling and
+storing the action.
+
+`cached`: every later execution, a hash of the code and an LRU lookup.
+
+Actions whose code fails to run here (e.g. a missing third-party import) are
+skipped and counted.
+
+    python benchmarks/action_cache.py --repeat 200
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from action_collective.action_cache import CompiledActionCache  # noqa: E402
+
+ACTION_DATAS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "populate", "action_datas.json"
+)
+
+
+def uncached(code: str) -> Callable:
+    namespace: dict = {}
+    exec(code, namespace)
+    return namespace["action"]
+
+
+def per_call_us(fn: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def summarize(samples: List[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[int(len(samples) * 0.95)], 2),
+    }
+
+
+def main(args: argparse.Namespace) -> dict:
+    with open(ACTION_DATAS_PATH) as f:
+        codes = [action["code"] for action in json.load(f)]
+
+    runnable, skipped = [], 0
+    for code in codes:
+        try:
+            uncached(code)
+            runnable.append(code)
+        except Exception:
+            skipped += 1
+
+    cache = CompiledActionCache(max_size=len(runnable))
+    results = {"uncached": [], "miss": [], "cached": []}
+    for code in runnable:
+        results["uncached"].append(per_call_us(lambda: uncached(code), args.repeat))
+
+        def miss() -> None:
+            cache.invalidate(code)
+            cache.get(code)
+
+        results["miss"].append(per_call_us(miss, args.repeat))
+        results["cached"].append(per_call_us(lambda: cache.get(code), args.repeat))
+
+    report = {name: summarize(samples) for name, samples in results.items()}
+    report["speedup_p50"] = round(report["uncached"]["p50_us"] / report["cached"]["p50_us"], 1)
+    return {"actions": len(runnable), "skipped": skipped, "repeat": args.repeat, **report}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200, help="Executions timed per action")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "results": main(args),
+    }
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,167 @@
+"""Concurrent retrieval throughput of BackendService against a local stub backend.
+
+The stub is a minimal HTTP/1.1 keep-alive server on 127.0.0.1, run in its own
+process so it does not compete with the client for the GIL. It answers every
+/retrieve_actions after --delay-ms with one stored action, and counts the TCP
+connections it accepts.
+
+`requests`: the previous transport, a blocking `requests.post` per call
+inside `async def`. Concurrent calls block the event loop and run one after
+another, each on a new connection.
+
+`httpx`: the current BackendService, on the shared keep-alive pool.
+
+    python benchmarks/backend_throughput.py --concurrency 1 8 32 --requests 400
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from typing import List
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from action_collective.models.actions import ActionData  # noqa: E402
+from action_collective.services.backend import (  # noqa: E402
+    BackendService,
+    close_shared_http_client,
+)
+
+ACTION = {
+    "id": "00000000-0000-0000-0000-000000000000",
+    "score": 0.93,
+    "input_json_schema": json.dumps({"type": "object", "properties": {}}),
+    "output_json_schema": json.dumps({"type": "object", "properties": {}}),
+    "code": "def action(input):\n    return {}\n",
+    "test": "assert action({}) == {}\n",
+}
+
+
+class StubBackend:
+    """Answers every request with `body` after `delay` seconds, keeping connections open"""
+
+    def __init__(self, body: bytes, delay: float):
+        self.body = body
+        self.delay = delay
+        self._connections = multiprocessing.Value("i", 0)
+        self._process: "multiprocessing.Process | None" = None
+
+    @property
+    def connections(self) -> int:
+        return self._connections.value
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        with self._connections.get_lock():
+            self._connections.value += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                await asyncio.sleep(self.delay)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(self.body), self.body)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self, ports: "multiprocessing.Queue[int]") -> None:
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=1024)
+        ports.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    def _run(self, ports: "multiprocessing.Queue[int]") -> None:
+        asyncio.run(self._serve(ports))
+
+    def start(self) -> str:
+        ports: "multiprocessing.Queue[int]" = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=self._run, args=(ports,), daemon=True)
+        self._process.start()
+        return f"http://127.0.0.1:{ports.get()}"
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+
+
+async def legacy_retrieve(backend_url: str, chat_history: List[dict]) -> List[ActionData]:
+    response = requests.post(
+        f"{backend_url}/retrieve_actions",
+        json={"chat_history": chat_history, "top_k": 5, "threshold": 0.7},
+    )
+    return [ActionData.model_validate(action) for action in response.json()]
+
+
+async def run(name: str, backend_url: str, n_requests: int, concurrency: int) -> float:
+    service = BackendService(backend_url)
+    chat_history = [{"role": "user", "content": "Multiply two matrices"}]
+    counter = iter(range(n_requests))
+
+    async def worker() -> None:
+        for _ in counter:
+            if name == "requests":
+                await legacy_retrieve(backend_url, chat_history)
+            else:
+                await service.retrieve_actions(chat_history)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await close_shared_http_client()
+    return elapsed
+
+
+def main(args: argparse.Namespace) -> List[dict]:
+    results = []
+    for name in ("requests", "httpx"):
+        for concurrency in args.concurrency:
+            # A fresh stub per run so its connection count is the run's own
+            stub = StubBackend(json.dumps([ACTION]).encode(), args.delay_ms / 1000)
+            backend_url = stub.start()
+            try:
+                elapsed = asyncio.run(run(name, backend_url, args.requests, concurrency))
+            finally:
+                stub.stop()
+            results.append(
+                {
+                    "transport": name,
+                    "concurrency": concurrency,
+                    "requests": args.requests,
+                    "duration_s": round(elapsed, 3),
+                    "rps": round(args.requests / elapsed, 1),
+                    "connections_opened": stub.connections,
+                }
+            )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400, help="Retrievals per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--delay-ms", type=float, default=5.0,
+                        help="Stub backend processing time per request")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "results": main(args),
+    }
+    print(json.dumps(report, indent=2))